@@ -0,0 +1,138 @@
+# bench/__main__.py
+#
+# Offline benchmark for the bot's hot paths. No token or network needed: the real cogs
+# run against FakeHTTP/FakeGateway and a temporary database.
+#
+#   python -m bench                       # every workload, saved to bench/results/
+#   python -m bench --only xp_messages --scale 0.2
+#   python -m bench --compare bench/results/<older>.json
+#
+# Each workload runs twice: once for timing, once under tracemalloc for allocations
+# (skip that with --no-alloc). Results are compared against the newest previous run.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# Never bind the metrics endpoint from a benchmark run
+os.environ.setdefault("METRICS_PORT", "0")
+# Prefetch would send the fake queue's video IDs to yt-dlp; the benchmark stays offline
+os.environ["PREFETCH_WINDOW"] = "0"
+
+import discord
+
+from bench.harness import measure
+from bench.workloads import WORKLOADS
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def latest_result(exclude=None):
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    files = sorted(f for f in os.listdir(RESULTS_DIR) if f.endswith(".json"))
+    files = [os.path.join(RESULTS_DIR, f) for f in files]
+    files = [f for f in files if f != exclude]
+    return files[-1] if files else None
+
+
+def print_table(results, baseline=None):
+    columns = ("ops_per_sec", "p50_ms", "p99_ms", "alloc_peak_kib", "db_growth_bytes")
+    print(f"{'workload':<20}" + "".join(f"{c:>18}" for c in columns))
+    for name, result in results.items():
+        row = f"{name:<20}"
+        before = (baseline or {}).get(name, {})
+        for column in columns:
+            value = result.get(column)
+            if value is None:
+                row += f"{'-':>18}"
+                continue
+            cell = f"{value:g}"
+            if before.get(column):
+                change = (value - before[column]) / before[column] * 100
+                cell += f" ({change:+.0f}%)"
+            row += f"{cell:>18}"
+        print(row)
+
+        calls = ", ".join(f"{k}={v}" for k, v in sorted(result.get("http_calls", {}).items()))
+        if calls:
+            print(f"{'':<20}  http: {calls}")
+
+
+async def run_all(names, args):
+    results = {}
+    for name in names:
+        random.seed(args.seed)
+        result = await measure(WORKLOADS[name](scale=args.scale))
+        if args.alloc:
+            random.seed(args.seed)
+            traced = await measure(WORKLOADS[name](scale=args.scale), trace_allocations=True)
+            result["alloc_peak_kib"] = traced["alloc_peak_kib"]
+            result["alloc_retained_kib"] = traced["alloc_retained_kib"]
+        results[name] = result
+        print(f"  {name}: {result['ops']} ops in {result['seconds']}s", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline benchmark for the bot's hot paths.")
+    parser.add_argument("--only", nargs="+", choices=sorted(WORKLOADS), help="run just these workloads")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every workload's size")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--no-alloc", dest="alloc", action="store_false", help="skip the tracemalloc pass")
+    parser.add_argument("--no-save", dest="save", action="store_false", help="don't write a results file")
+    parser.add_argument("--compare", help="results file to compare against (default: newest in bench/results)")
+    args = parser.parse_args()
+
+    names = args.only or list(WORKLOADS)
+    results = asyncio.run(run_all(names, args))
+
+    report = {
+        "meta": {
+            "git_rev": git_rev(),
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "discord_py": discord.__version__,
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    path = None
+    if args.save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(report["meta"]["timestamp"]))
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{report['meta']['git_rev']}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    baseline = None
+    baseline_path = args.compare or latest_result(exclude=path)
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("scale") != args.scale:
+            print(f"note: {baseline_path} was run at scale {baseline['meta'].get('scale')}", file=sys.stderr)
+        print(f"compared with {os.path.basename(baseline_path)} ({baseline['meta'].get('git_rev')})")
+
+    print_table(results, baseline["results"] if baseline else None)
+    if path:
+        print(f"saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# bench/fakes.py
+#
+# Offline stand-ins for Discord. FakeHTTP answers every REST call the cogs make with a
+# plausible payload (and counts it); FakeGateway pushes synthetic gateway payloads
+# through discord.py's own parsers, the same path the websocket uses. This reaches into
+# a few private discord.py attributes (_connection, parsers, _async_setup_hook), which
+# is fine for a harness but means it tracks discord.py 2.x.
+
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+
+BOT_USER_ID = 1_000_000_000_000_001
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Snowflakes:
+    # Monotonic fake IDs, shaped like real snowflakes so created_at still parses
+    def __init__(self):
+        base = int((datetime.now(timezone.utc).timestamp() * 1000 - 1420070400000)) << 22
+        self.counter = itertools.count(base)
+
+    def __call__(self):
+        return next(self.counter)
+
+
+def user_payload(user_id, bot=False):
+    return {
+        "id": str(user_id),
+        "username": f"user{user_id % 100000}",
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def member_payload(user_id):
+    return {"user": user_payload(user_id), "roles": [], "joined_at": now_iso(), "deaf": False, "mute": False, "flags": 0}
+
+
+def message_payload(message_id, channel_id, author, content="", embeds=(), guild_id=None, member=False):
+    data = {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "author": author,
+        "content": content,
+        "timestamp": now_iso(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": list(embeds),
+        "pinned": False,
+        "type": 0,
+    }
+    if guild_id is not None:
+        data["guild_id"] = str(guild_id)
+    if member:
+        data["member"] = {"roles": [], "joined_at": now_iso(), "deaf": False, "mute": False, "flags": 0}
+    return data
+
+
+class FakeHTTP:
+    def __init__(self, ids):
+        self.ids = ids
+        self.calls = Counter()
+        self.user = user_payload(BOT_USER_ID, bot=True)
+        self.loop = None
+
+    def __getattr__(self, name):
+        # Anything not modelled below (add_reaction, delete_message, ...) just succeeds
+        async def endpoint(*args, **kwargs):
+            self.calls[name] += 1
+            return {}
+        return endpoint
+
+    async def close(self):
+        pass
+
+    async def static_login(self, token):
+        self.calls["static_login"] += 1
+        return self.user
+
+    async def send_message(self, channel_id, *, params, **kwargs):
+        self.calls["send_message"] += 1
+        payload = getattr(params, "payload", None) or {}
+        return message_payload(self.ids(), channel_id, self.user, payload.get("content") or "", payload.get("embeds") or ())
+
+    async def edit_message(self, channel_id, message_id, *, params, **kwargs):
+        self.calls["edit_message"] += 1
+        payload = getattr(params, "payload", None) or {}
+        return message_payload(message_id, channel_id, self.user, payload.get("content") or "", payload.get("embeds") or ())
+
+    async def get_user(self, user_id):
+        self.calls["get_user"] += 1
+        return user_payload(int(user_id))
+
+
+class FakeGateway:
+    def __init__(self, bot, ids):
+        self.state = bot._connection
+        self.ids = ids
+
+    def dispatch(self, event, data):
+        self.state.parsers[event](data)
+
+    def add_guild(self, members=50, channels=1):
+        guild_id = self.ids()
+        channel_payloads = [
+            {
+                "id": str(self.ids()), "type": 0, "name": f"general-{i}", "position": i,
+                "permission_overwrites": [], "nsfw": False, "parent_id": None, "topic": None,
+                "rate_limit_per_user": 0, "last_message_id": None,
+            }
+            for i in range(channels)
+        ]
+        member_ids = [self.ids() for _ in range(members)]
+        data = {
+            "id": str(guild_id),
+            "name": f"bench-{guild_id % 100000}",
+            "owner_id": str(member_ids[0] if member_ids else BOT_USER_ID),
+            "roles": [{
+                "id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0,
+                "color": 0, "hoist": False, "managed": False, "mentionable": False,
+            }],
+            "channels": channel_payloads,
+            "members": [member_payload(user_id) for user_id in member_ids],
+            "member_count": members,
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "voice_states": [],
+            "presences": [],
+            "threads": [],
+            "large": False,
+            "unavailable": False,
+        }
+        return self.state._add_guild_from_data(data)
+
+    def message_create(self, guild, channel, user_id, content="hello"):
+        self.dispatch("MESSAGE_CREATE", self.message_create_payload(guild, channel, user_id, content))
+
+    def message_create_payload(self, guild, channel, user_id, content="hello"):
+        return message_payload(self.ids(), channel.id, user_payload(user_id), content, guild_id=guild.id, member=True)
+
+    def reaction(self, guild, channel, message_id, user_id, emoji, add=True):
+        data = {
+            "user_id": str(user_id),
+            "channel_id": str(channel.id),
+            "message_id": str(message_id),
+            "guild_id": str(guild.id),
+            "emoji": {"id": None, "name": emoji},
+            "burst": False,
+            "type": 0,
+        }
+        if add:
+            data["member"] = member_payload(user_id)
+        self.dispatch("MESSAGE_REACTION_ADD" if add else "MESSAGE_REACTION_REMOVE", data)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.done = False
+
+    def is_done(self):
+        return self.done
+
+    async def send_message(self, content=None, **kwargs):
+        self.done = True
+
+    async def defer(self, **kwargs):
+        self.done = True
+
+    async def edit_message(self, **kwargs):
+        self.done = True
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, *, wait=False, embed=None, **kwargs):
+        if not wait:
+            return None
+        # A real Message, so edits and reactions on it go through FakeHTTP like they would live
+        http = self.interaction.client.http
+        data = message_payload(http.ids(), self.interaction.channel.id, http.user, content or "",
+                               [embed.to_dict()] if embed else ())
+        return self.interaction.client._connection.create_message(channel=self.interaction.channel, data=data)
+
+
+class FakeInteraction:
+    # Just enough of discord.Interaction for calling a command's callback directly
+    def __init__(self, client, guild, channel, user):
+        self.client = client
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = channel
+        self.channel_id = channel.id
+        self.user = user
+        self.message = None
+        self.command = None
+        self.extras = {}
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
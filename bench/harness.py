@@ -0,0 +1,150 @@
+# bench/harness.py
+#
+# Builds a JengBot with the real cogs on top of FakeHTTP/FakeGateway and a throwaway
+# database, then measures one workload: ops/s, latency percentiles, allocations,
+# bytes written and the Discord calls it would have made.
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import discord
+
+from bench.fakes import FakeGateway, FakeHTTP, Snowflakes
+from utils.cogs import load_cogs
+from utils.metrics import metrics
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+def io_write_bytes():
+    # Bytes this process handed to write(); None where /proc isn't available
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class Harness:
+    def __init__(self, cogs):
+        self.cogs = cogs
+        self.workdir = tempfile.mkdtemp(prefix="jeng-bench-")
+        self.db_path = os.path.join(self.workdir, "bench.db")
+        self.ids = Snowflakes()
+        self.bot = None
+        self.http = None
+        self.gateway = None
+
+    async def start(self):
+        os.environ["DB_FILE"] = self.db_path
+        from main import JengBot
+
+        self.bot = JengBot()
+        self.http = FakeHTTP(self.ids)
+        self.bot.http = self.http
+        self.bot._connection.http = self.http
+        await self.bot._async_setup_hook()
+        self.bot._connection.user = discord.ClientUser(state=self.bot._connection, data=self.http.user)
+
+        await self.bot.storage.open()
+        metrics.histograms.clear()
+        metrics.counters.clear()
+        await metrics.start()
+        await load_cogs(self.bot, list(self.cogs))
+        self.bot._ready.set()
+        self.gateway = FakeGateway(self.bot, self.ids)
+
+    async def stop(self):
+        await self.bot.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def db_bytes(self):
+        return sum(
+            os.path.getsize(self.db_path + suffix)
+            for suffix in ("", "-wal", "-shm")
+            if os.path.exists(self.db_path + suffix)
+        )
+
+    def cog(self, name):
+        return self.bot.get_cog(name)
+
+
+async def measure(workload, trace_allocations=False):
+    """Run one workload in a fresh harness and return its numbers."""
+    harness = Harness(workload.cogs)
+    await harness.start()
+    try:
+        await workload.prepare(harness)
+        # Let setup traffic settle so it isn't billed to the workload
+        await asyncio.sleep(0)
+        http_before = dict(harness.http.calls)
+        db_before = harness.db_bytes()
+        io_before = io_write_bytes()
+        metrics.histograms.clear()
+        metrics.counters.clear()
+
+        if trace_allocations:
+            tracemalloc.start()
+            traced_before = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        ops, latencies = await workload.run(harness)
+        elapsed = time.perf_counter() - start
+
+        # Waiting for background work (batched writes etc.) isn't part of the throughput,
+        # but its allocations, writes and Discord calls still count
+        finish_seconds = None
+        if hasattr(workload, "finish"):
+            finish_start = time.perf_counter()
+            await workload.finish(harness)
+            finish_seconds = round(time.perf_counter() - finish_start, 4)
+
+        result = {
+            "ops": ops,
+            "seconds": round(elapsed, 4),
+            "ops_per_sec": round(ops / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+        if finish_seconds is not None:
+            result["finish_seconds"] = finish_seconds
+
+        if trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result["alloc_peak_kib"] = round((peak - traced_before) / 1024, 1)
+            result["alloc_retained_kib"] = round((current - traced_before) / 1024, 1)
+
+        io_after = io_write_bytes()
+        result["db_growth_bytes"] = harness.db_bytes() - db_before
+        if io_before is not None and io_after is not None:
+            result["io_write_bytes"] = io_after - io_before
+
+        result["http_calls"] = {
+            name: count - http_before.get(name, 0)
+            for name, count in harness.http.calls.items()
+            if count != http_before.get(name, 0)
+        }
+
+        for labels, histogram in metrics.series("listener_seconds"):
+            p99 = histogram.percentiles(99)[0]
+            result.setdefault("listener_p99_ms", {})[labels["listener"]] = round(p99 * 1000, 3)
+        lag = metrics.series("loop_lag_seconds")
+        if lag:
+            result["loop_lag_p99_ms"] = round(lag[0][1].percentiles(99)[0] * 1000, 3)
+
+        return result
+    finally:
+        await harness.stop()
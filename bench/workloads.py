@@ -0,0 +1,227 @@
+# bench/workloads.py
+#
+# Synthetic workloads. Each one sets up its guilds/data in prepare() (not measured) and
+# returns (ops, per-op latencies in seconds) from run(). Sizes scale with --scale.
+
+import asyncio
+import random
+import sys
+import time
+
+from bench.fakes import FakeInteraction
+
+
+def module_of(cog):
+    return sys.modules[type(cog).__module__]
+
+
+async def drain_xp(xp, expected, timeout=60):
+    # Wait until the ingest task has applied (or dropped) every message we fed it
+    deadline = time.monotonic() + timeout
+    while xp.stats["events"] + xp.stats["dropped_cooldown"] + xp.stats["dropped_full"] < expected:
+        if time.monotonic() > deadline:
+            raise TimeoutError("XP pipeline did not drain")
+        await asyncio.sleep(0.01)
+
+
+class XPMessages:
+    """Steady message traffic spread over many guilds (the on_message hot path)."""
+    cogs = ("xp",)
+
+    def __init__(self, scale=1.0, rate=10_000, seconds=5, guilds=50, members=200):
+        self.rate = rate
+        self.messages = max(1, int(rate * seconds * scale))
+        self.guild_count = guilds
+        self.members = members
+
+    async def prepare(self, h):
+        self.guilds = [h.gateway.add_guild(members=self.members) for _ in range(self.guild_count)]
+        # Payloads are built up front so only parsing + dispatch is timed
+        self.payloads = []
+        for i in range(self.messages):
+            guild = self.guilds[i % len(self.guilds)]
+            member = random.choice(guild.members)
+            self.payloads.append(h.gateway.message_create_payload(guild, guild.text_channels[0], member.id))
+
+    async def run(self, h):
+        latencies = []
+        tick = 0.01
+        per_tick = max(1, int(self.rate * tick))
+        next_tick = time.perf_counter()
+
+        for start in range(0, len(self.payloads), per_tick):
+            for data in self.payloads[start:start + per_tick]:
+                t0 = time.perf_counter()
+                h.gateway.dispatch("MESSAGE_CREATE", data)
+                latencies.append(time.perf_counter() - t0)
+            next_tick += tick
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+        return len(self.payloads), latencies
+
+    async def finish(self, h):
+        # Applied in XP_BATCH_WINDOW batches, so draining is mostly waiting on that timer
+        xp = h.cog("XPSystem")
+        await drain_xp(xp, len(self.payloads))
+        await xp.flush()
+
+
+class LeaderboardBurst:
+    """Many concurrent /leaderboard calls, some needing users that left the guild."""
+    cogs = ("xp",)
+
+    def __init__(self, scale=1.0, calls=500, guilds=10, members=300, concurrency=50, departed=0.2):
+        self.calls = max(1, int(calls * scale))
+        self.guild_count = guilds
+        self.members = members
+        self.concurrency = concurrency
+        self.departed = departed
+
+    async def prepare(self, h):
+        xp = h.cog("XPSystem")
+        self.guilds = [h.gateway.add_guild(members=self.members) for _ in range(self.guild_count)]
+        fed = 0
+        for guild in self.guilds:
+            for member in list(guild.members):
+                for _ in range(random.randint(1, 20)):
+                    h.gateway.message_create(guild, guild.text_channels[0], member.id)
+                    fed += 1
+            # One guild at a time so the ingest queue never fills up and drops messages
+            await drain_xp(xp, fed)
+        await xp.flush()
+        # Members who left still rank, so their names go through the user cache / REST path
+        for guild in self.guilds:
+            members = list(guild.members)
+            for member in random.sample(members, int(len(members) * self.departed)):
+                guild._remove_member(member)
+
+    async def run(self, h):
+        xp = h.cog("XPSystem")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        latencies = []
+
+        async def one(i):
+            guild = self.guilds[i % len(self.guilds)]
+            interaction = FakeInteraction(h.bot, guild, guild.text_channels[0], guild.members[0])
+            async with semaphore:
+                t0 = time.perf_counter()
+                await xp.leaderboard.callback(xp, interaction)
+                latencies.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(one(i) for i in range(self.calls)))
+        return self.calls, latencies
+
+
+class QuotesMix:
+    """Quote adds and random reads, one write per four reads."""
+    cogs = ("quotes",)
+
+    def __init__(self, scale=1.0, ops=2_000, guilds=5):
+        self.ops = max(1, int(ops * scale))
+        self.guild_count = guilds
+
+    async def prepare(self, h):
+        self.guilds = [h.gateway.add_guild(members=10) for _ in range(self.guild_count)]
+
+    async def run(self, h):
+        quotes = h.cog("Quotes")
+        latencies = []
+        for i in range(self.ops):
+            guild = self.guilds[i % len(self.guilds)]
+            interaction = FakeInteraction(h.bot, guild, guild.text_channels[0], guild.members[0])
+            t0 = time.perf_counter()
+            if i % 5 == 0:
+                await quotes.quote_add.callback(quotes, interaction, f"quote {i} - someone")
+            else:
+                await quotes.quote_get.callback(quotes, interaction)
+            latencies.append(time.perf_counter() - t0)
+        return self.ops, latencies
+
+
+class PollVotes:
+    """Reaction votes streaming into open polls, then closing every poll."""
+    cogs = ("polls",)
+    emojis = ("🍎", "🍌", "🍒", "🍇")
+
+    def __init__(self, scale=1.0, polls=20, voters=500):
+        self.poll_count = polls
+        self.voters = max(1, int(voters * scale))
+
+    async def prepare(self, h):
+        polls = h.cog("Polls")
+        self.guild = h.gateway.add_guild(members=self.voters)
+        self.channel = self.guild.text_channels[0]
+        self.messages = []
+        for i in range(self.poll_count):
+            interaction = FakeInteraction(h.bot, self.guild, self.channel, self.guild.members[0])
+            options = {}
+            for n, emoji in enumerate(self.emojis, start=1):
+                options[f"option{n}_text"] = f"Option {n}"
+                options[f"option{n}_emoji"] = emoji
+            await polls.poll.callback(polls, interaction, f"Question {i}?", 60, False, **options)
+        self.messages = list(polls.polls)
+
+    async def run(self, h):
+        polls = h.cog("Polls")
+        latencies = []
+        ops = 0
+        for member in self.guild.members:
+            for message_id in self.messages:
+                t0 = time.perf_counter()
+                h.gateway.reaction(self.guild, self.channel, message_id, member.id, random.choice(self.emojis))
+                latencies.append(time.perf_counter() - t0)
+                ops += 1
+            await asyncio.sleep(0)  # let the listeners run
+
+        for message_id in self.messages:
+            t0 = time.perf_counter()
+            await polls.close_poll(message_id)
+            latencies.append(time.perf_counter() - t0)
+            ops += 1
+        return ops, latencies
+
+
+class MusicQueue:
+    """Queue churn on a long queue plus /queue renders."""
+    cogs = ("music",)
+
+    def __init__(self, scale=1.0, tracks=500, ops=2_000):
+        self.tracks = tracks
+        self.ops = max(1, int(ops * scale))
+
+    async def prepare(self, h):
+        music = h.cog("Music")
+        module = module_of(music)
+        self.guild = h.gateway.add_guild(members=5)
+        queue = module.get_queue(self.guild.id)
+        for i in range(self.tracks):
+            queue.append(module.Track(f"vid{i:07d}", f"Track {i}", f"https://i.ytimg.com/vi/vid{i:07d}/hqdefault.jpg", 180))
+
+    async def run(self, h):
+        music = h.cog("Music")
+        latencies = []
+        for i in range(self.ops):
+            interaction = FakeInteraction(h.bot, self.guild, self.guild.text_channels[0], self.guild.members[0])
+            t0 = time.perf_counter()
+            kind = i % 4
+            if kind == 0:
+                await music.queue.callback(music, interaction)
+            elif kind == 1:
+                await music.move.callback(music, interaction, random.randint(1, self.tracks), random.randint(1, self.tracks))
+            elif kind == 2:
+                await music.shuffle.callback(music, interaction)
+            else:
+                # Remove and put back so the queue length stays steady
+                await music.remove.callback(music, interaction, random.randint(1, self.tracks))
+                module_of(music).get_queue(self.guild.id).append(module_of(music).Track(f"re{i:08d}", f"Readded {i}"))
+            latencies.append(time.perf_counter() - t0)
+        return self.ops, latencies
+
+
+WORKLOADS = {
+    "xp_messages": XPMessages,
+    "leaderboard_burst": LeaderboardBurst,
+    "quotes_mix": QuotesMix,
+    "poll_votes": PollVotes,
+    "music_queue": MusicQueue,
+}
@@ -0,0 +1,49 @@
+import discord
+from discord.ext import commands
+from discord import app_commands, Interaction, Embed
+from utils.debug import debug_command
+from utils.edits import join_limited
+from utils.metrics import metrics
+
+def format_ms(seconds):
+    return f"{seconds * 1000:.0f}ms"
+
+def describe_latency(series, label_key, limit=10):
+    # Busiest first; one line per command/listener
+    lines = []
+    for labels, histogram in sorted(series, key=lambda item: item[1].count, reverse=True)[:limit]:
+        name = labels.get(label_key, "?")
+        if labels.get("status") == "error":
+            name += " (error)"
+        p50, p95, p99 = histogram.percentiles(50, 95, 99)
+        lines.append(f"`{name}` ×{histogram.count} • p50 {format_ms(p50)} • p95 {format_ms(p95)} • p99 {format_ms(p99)}")
+    return join_limited(lines, "No samples yet")
+
+class Admin(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="latency", description="Shows command, listener and event-loop latency.")
+    @app_commands.default_permissions(administrator=True)
+    async def latency(self, interaction: Interaction):
+        debug_command("latency", interaction.user)
+
+        embed = Embed(title="⏱️ Latency", color=discord.Color.blurple())
+        embed.add_field(name="Commands", value=describe_latency(metrics.series("command_seconds"), "command"), inline=False)
+        embed.add_field(name="Listeners", value=describe_latency(metrics.series("listener_seconds"), "listener"), inline=False)
+
+        lag = metrics.series("loop_lag_seconds")
+        slow = sum(value for (name, _), value in metrics.counters.items() if name == "slow_callbacks")
+        if lag:
+            p50, p95, p99 = lag[0][1].percentiles(50, 95, 99)
+            loop_value = f"p50 {format_ms(p50)} • p95 {format_ms(p95)} • p99 {format_ms(p99)}\nSlow callbacks: {slow}"
+        else:
+            loop_value = "No samples yet"
+        embed.add_field(name="Event Loop Lag", value=loop_value, inline=False)
+        embed.set_footer(text=f"Gateway heartbeat: {format_ms(self.bot.latency)} • percentiles over recent samples")
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# --- Cog Setup ---
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
@@ -1,63 +1,134 @@
 import discord
 from discord.ext import commands
 from discord import app_commands, Interaction, Embed, ui
-from datetime import datetime
-import pytz
-
-# --- Color Codes ---
-GREEN = "\033[92m"
-YELLOW = "\033[93m"
-CYAN = "\033[96m"
-RESET = "\033[0m"
-
-def debug_command(name, user, **kwargs):
-    print(f"{GREEN}[COMMAND] /{name}{RESET} triggered by {YELLOW}{user.display_name}{RESET}")
-    if kwargs:
-        print(f"{CYAN}Input:{RESET}")
-        for key, value in kwargs.items():
-            print(f"  {key}: {value}")
+from datetime import datetime, timezone
+import os
+import time as clock
+from collections import OrderedDict
+from utils.edits import EditCoalescer, join_limited, truncate
+from utils.debug import debug_command
 
-class RSVPView(ui.View):
-    def __init__(self, creator, title, time, location, details):
-        super().__init__(timeout=None)
-        self.creator = creator
+EVENT_CACHE_SIZE = int(os.getenv("EVENT_CACHE_SIZE", "512"))  # events kept in memory; older ones reload from the database
+
+EVENT_COLUMNS = "message_id, guild_id, channel_id, creator_id, creator_name, title, time, location, details, created_at"
+
+class Event:
+    # One RSVP event, mirrored from the events and event_rsvps tables. RSVPs are kept
+    # as plain user IDs; mentions are rendered from them, so no Member objects are held.
+    __slots__ = ("message_id", "guild_id", "channel_id", "creator_id", "creator_name",
+                 "title", "time", "location", "details", "created_at", "going", "not_going")
+
+    def __init__(self, message_id, guild_id, channel_id, creator_id, creator_name, title, time, location, details, created_at):
+        self.message_id = message_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.creator_id = creator_id
+        self.creator_name = creator_name
         self.title = title
         self.time = time
         self.location = location
         self.details = details
+        self.created_at = created_at
         self.going = set()
         self.not_going = set()
-        self.message = None
-
-    def format_embed(self):
-        embed = Embed(title=f"📅 {self.title}", description="Click a button to RSVP!", color=discord.Color.gold())
-        embed.add_field(name="🕒 Time", value=self.time, inline=False)
-        embed.add_field(name="📍 Location", value=self.location, inline=False)
-        embed.add_field(name="📝 Details", value=self.details or "None", inline=False)
-        embed.add_field(name="✅ Going", value="\n".join(u.mention for u in self.going) or "No one yet", inline=True)
-        embed.add_field(name="❌ Not Going", value="\n".join(u.mention for u in self.not_going) or "No one yet", inline=True)
-        embed.set_footer(text=f"Event created by {self.creator.display_name}")
-        embed.timestamp = datetime.now(pytz.timezone("US/Eastern"))
-        return embed
-
-    @ui.button(label="✅ Going", style=discord.ButtonStyle.success)
+
+    def rsvp(self, user_id, going):
+        # Returns False if nothing changed
+        add, remove = (self.going, self.not_going) if going else (self.not_going, self.going)
+        if user_id in add:
+            return False
+        remove.discard(user_id)
+        add.add(user_id)
+        return True
+
+    def to_row(self):
+        return (
+            self.message_id, self.guild_id, self.channel_id, self.creator_id, self.creator_name,
+            self.title, self.time, self.location, self.details, self.created_at
+        )
+
+def format_embed(event):
+    embed = Embed(title=f"📅 {event.title}", description="Click a button to RSVP!", color=discord.Color.gold())
+    embed.add_field(name="🕒 Time", value=truncate(event.time), inline=False)
+    embed.add_field(name="📍 Location", value=truncate(event.location), inline=False)
+    embed.add_field(name="📝 Details", value=truncate(event.details or "None"), inline=False)
+    embed.add_field(name="✅ Going", value=join_limited((f"<@{user_id}>" for user_id in event.going), "No one yet"), inline=True)
+    embed.add_field(name="❌ Not Going", value=join_limited((f"<@{user_id}>" for user_id in event.not_going), "No one yet"), inline=True)
+    embed.set_footer(text=f"Event created by {event.creator_name}")
+    embed.timestamp = datetime.fromtimestamp(event.created_at, tz=timezone.utc)
+    return embed
+
+class RSVPView(ui.View):
+    # Persistent: fixed custom_ids mean the one instance registered in cog_load handles
+    # the buttons on every event message, including ones sent before a restart
+    def __init__(self, cog):
+        super().__init__(timeout=None)
+        self.cog = cog
+
+    @ui.button(label="✅ Going", style=discord.ButtonStyle.success, custom_id="event:rsvp:going")
     async def yes(self, interaction: Interaction, button: ui.Button):
-        self.not_going.discard(interaction.user)
-        self.going.add(interaction.user)
-        await self.update(interaction)
+        await self.cog.rsvp(interaction, going=True)
 
-    @ui.button(label="❌ Not Going", style=discord.ButtonStyle.danger)
+    @ui.button(label="❌ Not Going", style=discord.ButtonStyle.danger, custom_id="event:rsvp:not_going")
     async def no(self, interaction: Interaction, button: ui.Button):
-        self.going.discard(interaction.user)
-        self.not_going.add(interaction.user)
-        await self.update(interaction)
-
-    async def update(self, interaction: Interaction):
-        await interaction.response.edit_message(embed=self.format_embed(), view=self)
+        await self.cog.rsvp(interaction, going=False)
 
 class Events(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.storage = bot.storage
+        self.events = OrderedDict()  # message_id -> Event, LRU; loaded the first time someone clicks
+        self.view = RSVPView(self)
+        self.edits = EditCoalescer("events")
+
+    async def cog_load(self):
+        self.bot.add_view(self.view)
+
+    async def cog_unload(self):
+        self.edits.close()
+
+    async def get_event(self, message_id):
+        event = self.events.get(message_id)
+        if event is not None:
+            self.events.move_to_end(message_id)
+            return event
+
+        row = await self.storage.fetchone(f"SELECT {EVENT_COLUMNS} FROM events WHERE message_id = ?", (message_id,))
+        if row is None:
+            return None
+        event = Event(*row)
+        for user_id, going in await self.storage.fetchall(
+            "SELECT user_id, going FROM event_rsvps WHERE message_id = ?", (message_id,)
+        ):
+            (event.going if going else event.not_going).add(user_id)
+        # Another click may have loaded it while we were reading
+        return self.remember(self.events.setdefault(message_id, event))
+
+    def remember(self, event):
+        self.events[event.message_id] = event
+        self.events.move_to_end(event.message_id)
+        while len(self.events) > EVENT_CACHE_SIZE:
+            self.events.popitem(last=False)
+        return event
+
+    async def rsvp(self, interaction: Interaction, going):
+        event = await self.get_event(interaction.message.id)
+        if event is None:
+            await interaction.response.send_message("This event is no longer available.", ephemeral=True)
+            return
+
+        # Ack right away; a burst of clicks becomes one embed edit per EDIT_INTERVAL
+        changed = event.rsvp(interaction.user.id, going)
+        await interaction.response.defer()
+        if not changed:
+            return
+
+        self.edits.request(interaction.message, lambda: {"embed": format_embed(event)})
+        await self.storage.execute(
+            "INSERT INTO event_rsvps (message_id, user_id, going) VALUES (?, ?, ?) "
+            "ON CONFLICT(message_id, user_id) DO UPDATE SET going = excluded.going",
+            (event.message_id, interaction.user.id, int(going))
+        )
 
     @app_commands.command(name="event", description="Create an interactive RSVP event.")
     @app_commands.describe(
@@ -77,19 +148,17 @@ class Events(commands.Cog):
             details=details
         )
 
-        view = RSVPView(
-            creator=interaction.user,
-            title=title,
-            time=time,
-            location=location,
-            details=details
+        event = Event(
+            0, interaction.guild.id, interaction.channel.id,
+            interaction.user.id, interaction.user.display_name,
+            title, time, location, details, clock.time()
         )
 
-        embed = view.format_embed()
-        msg = await interaction.followup.send(embed=embed, view=view, wait=True)
-        view.message = msg
+        msg = await interaction.followup.send(embed=format_embed(event), view=self.view, wait=True)
+        event.message_id = msg.id
+        self.remember(event)
+        await self.storage.execute(f"INSERT INTO events ({EVENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", event.to_row())
 
 # --- Cog Setup ---
 async def setup(bot):
     await bot.add_cog(Events(bot))
-
@@ -2,8 +2,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands, ui, Interaction, Embed
 import random
-from datetime import datetime
-import pytz
+import asyncio
 from utils.debug import debug_command
 
 
@@ -93,12 +92,13 @@ class Misc(commands.Cog):
             await asyncio.sleep(0.75)  # ⏱️ add delay between messages
             await interaction.channel.send(f"{user.mention} wya")
 
-    @app_commands.command(name="snipe", description="Retrieves the last deleted message in the current channel.")
-    async def snipe(self, interaction: Interaction):
-        debug_command("snipe", interaction.user)
+    @app_commands.command(name="snipe", description="Retrieves a recently deleted message in the current channel.")
+    @app_commands.describe(index="1 for the latest deleted message, 2 for the one before, and so on")
+    async def snipe(self, interaction: Interaction, index: int = 1):
+        debug_command("snipe", interaction.user, index=index)
 
-        sniped_messages = self.bot.sniped_messages
-        snipe_data = sniped_messages.get(interaction.channel.id)
+        snipes = self.bot.snipes
+        snipe_data = snipes.get(interaction.channel.id, index)
 
         if not snipe_data:
             await interaction.response.send_message(embed=Embed(title="❌ Nothing to Snipe", description="No message to snipe here.", color=discord.Color.red()), ephemeral=True)
@@ -106,11 +106,12 @@ class Misc(commands.Cog):
 
         embed = Embed(
             title="Get sniped gang",
-            description=snipe_data["content"],
+            description=snipe_data.content,
             color=discord.Color.dark_red(),
-            timestamp=snipe_data["time"]
+            timestamp=snipe_data.created_at
         )
-        embed.set_author(name=snipe_data["author"].display_name, icon_url=snipe_data["author"].avatar.url if snipe_data["author"].avatar else None)
+        embed.set_author(name=snipe_data.author_name, icon_url=snipe_data.avatar_url)
+        embed.set_footer(text=f"Deleted message {index} of {snipes.count(interaction.channel.id)}")
         await interaction.response.send_message(embed=embed)
 
 
@@ -123,12 +124,16 @@ class Misc(commands.Cog):
 
     # 🎵 Music Commands
         music_embed = Embed(title="🎵 Music Commands", color=discord.Color.blue())
-        music_embed.add_field(name="/play <url>", value="Plays a song from the given URL.", inline=False)
+        music_embed.add_field(name="/play <url>", value="Plays a song or playlist from the given URL.", inline=False)
         music_embed.add_field(name="/queue", value="Shows the current music queue.", inline=False)
+        music_embed.add_field(name="/remove <position>", value="Removes a song from the queue.", inline=False)
+        music_embed.add_field(name="/move <position> <new_position>", value="Moves a song within the queue.", inline=False)
+        music_embed.add_field(name="/shuffle", value="Shuffles the queue.", inline=False)
         music_embed.add_field(name="/skip", value="Skips the current song.", inline=False)
         music_embed.add_field(name="/stop", value="Pauses the music.", inline=False)
         music_embed.add_field(name="/start", value="Resumes paused music.", inline=False)
         music_embed.add_field(name="/leave", value="Clears the queue and makes the bot leave the voice channel.", inline=False)
+        music_embed.add_field(name="/musicstats", value="Shows how much CPU voice playback is using.", inline=False)
         music_embed.set_footer(text="Page 1/5")
         pages.append(music_embed)
 
@@ -152,7 +157,7 @@ class Misc(commands.Cog):
 
     # 📊 Community Tools
         community_embed = Embed(title="📊 Community Tools", color=discord.Color.orange())
-        community_embed.add_field(name="/poll", value="Create a poll with emoji-based voting.", inline=False)
+        community_embed.add_field(name="/poll", value="Create a poll with emoji reactions or buttons for voting.", inline=False)
         community_embed.add_field(name="/event", value="Create an RSVP event for members.", inline=False)
         community_embed.set_footer(text="Page 4/5")
         pages.append(community_embed)
@@ -2,18 +2,147 @@ import discord
 from discord.ext import commands
 from discord import app_commands, Interaction, Embed, ui
 import asyncio
-import yt_dlp
 import math
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+from utils.scheduler import DeadlineScheduler
+from utils.debug import debug_command
+from utils.log import fields, get_logger
 
-queues = {}
+log = get_logger("music")
 
-# Debug logger
-def debug_command(command_name, user, **kwargs):
-    print(f"\033[1;32m[COMMAND] /{command_name}\033[0m triggered by \033[1;33m{user.display_name}\033[0m")
-    if kwargs:
-        print("\033[1;36mInput:\033[0m")
-        for key, value in kwargs.items():
-            print(f"\033[1;31m  {key.capitalize()}: {value}\033[0m")
+queues = {}  # guild_id -> GuildQueue
+
+# --- Extraction Settings ---
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "4"))      # yt-dlp lookups running at once
+EXTRACT_PER_GUILD = int(os.getenv("EXTRACT_PER_GUILD", "1"))  # of which one guild may hold at most
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "30"))   # seconds before /play gives up
+
+# --- Track Cache Settings ---
+TRACK_CACHE_SIZE = int(os.getenv("TRACK_CACHE_SIZE", "512"))              # tracks kept in memory
+TRACK_CACHE_PERSIST = os.getenv("TRACK_CACHE_PERSIST", "1") == "1"          # keep metadata in the database
+STREAM_URL_TTL = float(os.getenv("STREAM_URL_TTL", "1800"))                # used when a URL has no expiry
+STREAM_URL_MARGIN = float(os.getenv("STREAM_URL_MARGIN", "300"))           # re-resolve this long before expiry
+TRACK_TOUCH_BATCH = int(os.getenv("TRACK_TOUCH_BATCH", "32"))              # cache hits buffered before their timestamps are written
+
+# --- Idle Settings ---
+IDLE_TIMEOUT = float(os.getenv("IDLE_TIMEOUT", "60"))  # seconds with nothing to play before leaving voice
+
+# --- Prefetch Settings ---
+PREFETCH_WINDOW = int(os.getenv("PREFETCH_WINDOW", "1"))                   # upcoming tracks resolved ahead of time
+PREFETCH_OPEN_SOURCE = os.getenv("PREFETCH_OPEN_SOURCE", "0") == "1"        # also start FFmpeg for the very next track
+
+# --- Playlist Settings ---
+PLAYLIST_MAX_TRACKS = int(os.getenv("PLAYLIST_MAX_TRACKS", "200"))          # cap per imported playlist
+PLAYLIST_PROGRESS_EVERY = int(os.getenv("PLAYLIST_PROGRESS_EVERY", "25"))   # tracks between progress updates
+
+# --- Audio Settings ---
+FFMPEG_BEFORE_OPTIONS = os.getenv("FFMPEG_BEFORE_OPTIONS", "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5")  # survive stream drops
+FFMPEG_OPTIONS = os.getenv("FFMPEG_OPTIONS", "-vn")                     # output args, e.g. add -bufsize here
+OPUS_PASSTHROUGH = os.getenv("OPUS_PASSTHROUGH", "1") == "1"            # copy Opus streams instead of re-encoding
+OPUS_BITRATE = int(os.getenv("OPUS_BITRATE", "128"))                    # kbps when FFmpeg has to encode
+AUDIO_CPU_SAMPLE_FRAMES = int(os.getenv("AUDIO_CPU_SAMPLE_FRAMES", "250"))  # frames between FFmpeg CPU samples (5s)
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+YOUTUBE_ID_RE = re.compile(r"(?:v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})")
+
+YDL_OPTS = {
+    'format': 'bestaudio[acodec=opus]/bestaudio',  # Opus can be passed through without re-encoding
+    'noplaylist': True,
+    'cookiefile': 'cookies.txt',
+    'socket_timeout': 15
+}
+
+# Flat extraction lists playlist entries (id, title, URL) without resolving each video
+YDL_PLAYLIST_OPTS = {
+    'extract_flat': 'in_playlist',
+    'noplaylist': False,
+    'cookiefile': 'cookies.txt',
+    'socket_timeout': 15
+}
+
+class Track:
+    # One queued song. Only metadata lives here; the stream URL is resolved at play time.
+    __slots__ = ("id", "title", "thumbnail", "duration", "webpage_url")
+
+    def __init__(self, id, title, thumbnail=None, duration=None, webpage_url=None):
+        self.id = id
+        self.title = title
+        self.thumbnail = thumbnail
+        self.duration = duration
+        self.webpage_url = webpage_url
+
+class GuildQueue:
+    # A guild's upcoming tracks. Backed by a deque so enqueue/dequeue are O(1); every
+    # change bumps `version` so views can tell the queue moved under them.
+    def __init__(self):
+        self.tracks = deque()
+        self.version = 0
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __bool__(self):
+        return bool(self.tracks)
+
+    def _changed(self):
+        self.version += 1
+
+    def append(self, track):
+        self.tracks.append(track)
+        self._changed()
+
+    def appendleft(self, track):
+        self.tracks.appendleft(track)
+        self._changed()
+
+    def popleft(self):
+        track = self.tracks.popleft()
+        self._changed()
+        return track
+
+    def peek(self, count):
+        return list(islice(self.tracks, count))
+
+    def remove(self, index):
+        track = self.tracks[index]
+        del self.tracks[index]
+        self._changed()
+        return track
+
+    def move(self, src, dst):
+        track = self.tracks[src]
+        del self.tracks[src]
+        self.tracks.insert(dst, track)
+        self._changed()
+        return track
+
+    def shuffle(self):
+        tracks = list(self.tracks)
+        random.shuffle(tracks)
+        self.tracks = deque(tracks)
+        self._changed()
+
+    def clear(self):
+        self.tracks.clear()
+        self._changed()
+
+    def page(self, start, count):
+        # Only the requested slice is copied, never the whole queue
+        return list(islice(self.tracks, start, start + count))
+
+def get_queue(guild_id):
+    queue = queues.get(guild_id)
+    if queue is None:
+        queue = queues[guild_id] = GuildQueue()
+    return queue
 
 class QueueView(ui.View):
     def __init__(self, queue, per_page=5):
@@ -21,22 +150,33 @@ class QueueView(ui.View):
         self.queue = queue
         self.per_page = per_page
         self.page = 0
-        self.max_pages = math.ceil(len(queue) / per_page)
+        self.version = None  # queue version of the last render
 
     def format_embed(self):
+        # Every render reads the live queue, so pages follow it as it changes
+        max_pages = self.max_pages()
+        self.page = min(self.page, max_pages - 1)
+
         start = self.page * self.per_page
-        end = start + self.per_page
         embed = Embed(
-            title=f"🎶 Current Queue (Page {self.page + 1}/{self.max_pages})",
+            title=f"🎶 Current Queue (Page {self.page + 1}/{max_pages})",
             color=discord.Color.blue()
         )
-        songs_on_page = self.queue[start:end]
-        for i, song in enumerate(songs_on_page, start=start + 1):
-            embed.add_field(name=f"{i}. {song['title']}", value=" ", inline=False)
-        if songs_on_page:
-            embed.set_thumbnail(url=songs_on_page[0]['thumbnail'])
+        tracks_on_page = self.queue.page(start, self.per_page)
+        for i, track in enumerate(tracks_on_page, start=start + 1):
+            embed.add_field(name=f"{i}. {track.title}", value=" ", inline=False)
+        if tracks_on_page:
+            embed.set_thumbnail(url=tracks_on_page[0].thumbnail)
+        else:
+            embed.description = "No songs in queue."
+        if self.version is not None and self.version != self.queue.version:
+            embed.set_footer(text="The queue changed since the last page; positions are current.")
+        self.version = self.queue.version
         return embed
 
+    def max_pages(self):
+        return max(1, math.ceil(len(self.queue) / self.per_page))
+
     @ui.button(label="⬅️", style=discord.ButtonStyle.blurple)
     async def previous(self, interaction: Interaction, button: ui.Button):
         if self.page > 0:
@@ -47,43 +187,819 @@ class QueueView(ui.View):
 
     @ui.button(label="➡️", style=discord.ButtonStyle.blurple)
     async def next(self, interaction: Interaction, button: ui.Button):
-        if self.page < self.max_pages - 1:
+        if self.page < self.max_pages() - 1:
             self.page += 1
             await interaction.response.edit_message(embed=self.format_embed(), view=self)
         else:
             await interaction.response.defer()
 
+def parse_video_id(url):
+    match = YOUTUBE_ID_RE.search(url)
+    return match.group(1) if match else None
+
+def parse_stream_expiry(stream_url):
+    # googlevideo URLs carry their expiry either as ?expire=<unix time> or as /expire/<unix time>/
+    parsed = urlparse(stream_url)
+    expire = parse_qs(parsed.query).get("expire", [None])[0]
+    if expire is None:
+        match = re.search(r"/expire/(\d+)", parsed.path)
+        expire = match.group(1) if match else None
+    if expire and expire.isdigit():
+        return float(expire)
+    return time.time() + STREAM_URL_TTL
+
+def touch_track_cache(conn, touched):
+    conn.executemany("UPDATE track_cache SET updated_at = ? WHERE video_id = ?", [(at, video_id) for video_id, at in touched])
+
+def store_track_cache(conn, row, keep, touched=()):
+    touch_track_cache(conn, touched)
+    conn.execute(
+        "INSERT INTO track_cache (video_id, title, thumbnail, duration, webpage_url, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(video_id) DO UPDATE SET title = excluded.title, thumbnail = excluded.thumbnail, "
+        "duration = excluded.duration, webpage_url = excluded.webpage_url, updated_at = excluded.updated_at",
+        row
+    )
+    prune_track_cache(conn, keep)
+
+def prune_track_cache(conn, keep):
+    # The table mirrors the in-memory LRU, so anything past its size would never be loaded again
+    conn.execute(
+        "DELETE FROM track_cache WHERE video_id NOT IN "
+        "(SELECT video_id FROM track_cache ORDER BY updated_at DESC LIMIT ?)",
+        (keep,)
+    )
+
+class TrackCache:
+    # LRU cache of track metadata keyed by video ID. Title/thumbnail/duration are kept
+    # for as long as the entry survives; the signed stream URL only until it expires.
+    # Metadata is optionally mirrored to the database so the cache is warm after a restart.
+    def __init__(self, storage=None, max_size=TRACK_CACHE_SIZE):
+        self.storage = storage
+        self.max_size = max_size
+        self.entries = OrderedDict()  # video_id -> dict
+        self.pending_writes = set()
+        self.touched = {}             # video_id -> time of a cache hit not yet written
+
+    async def load(self):
+        if not self.storage:
+            return
+        await self.storage.transaction(prune_track_cache, self.max_size)
+        rows = await self.storage.fetchall(
+            "SELECT video_id, title, thumbnail, duration, webpage_url FROM track_cache ORDER BY updated_at DESC LIMIT ?",
+            (self.max_size,)
+        )
+        for video_id, title, thumbnail, duration, webpage_url in reversed(rows):
+            self.entries[video_id] = {
+                'id': video_id,
+                'title': title,
+                'thumbnail': thumbnail,
+                'duration': duration,
+                'webpage_url': webpage_url,
+                'stream_url': None,
+                'acodec': None,
+                'expires_at': 0
+            }
+
+    def get(self, video_id):
+        entry = self.entries.get(video_id)
+        if entry:
+            self.entries.move_to_end(video_id)
+            self.touch(video_id)
+        return entry
+
+    def fresh_stream_url(self, video_id):
+        entry = self.entries.get(video_id)
+        if entry and entry['stream_url'] and entry['expires_at'] - STREAM_URL_MARGIN > time.time():
+            self.entries.move_to_end(video_id)
+            self.touch(video_id)
+            return entry['stream_url']
+        return None
+
+    def touch(self, video_id):
+        # Hits bump updated_at too, or the tracks played most (and never re-extracted) would
+        # be the first rows pruned. They're batched and ride along with the next write.
+        if not self.storage:
+            return
+        self.touched[video_id] = int(time.time())
+        if len(self.touched) >= TRACK_TOUCH_BATCH:
+            self.write(touch_track_cache, self.take_touched())
+
+    def take_touched(self):
+        touched = list(self.touched.items())
+        self.touched.clear()
+        return touched
+
+    def write(self, fn, *args):
+        task = asyncio.create_task(self.storage.transaction(fn, *args))
+        self.pending_writes.add(task)
+        task.add_done_callback(self.pending_writes.discard)
+
+    async def flush(self):
+        if self.storage and self.touched:
+            self.write(touch_track_cache, self.take_touched())
+        if self.pending_writes:
+            await asyncio.gather(*self.pending_writes, return_exceptions=True)
+
+    def codec(self, video_id):
+        entry = self.entries.get(video_id)
+        return entry['acodec'] if entry else None
+
+    def put(self, info):
+        video_id = info.get('id') or info.get('webpage_url') or info['url']
+        entry = {
+            'id': video_id,
+            'title': info.get('title', 'Unknown title'),
+            'thumbnail': info.get('thumbnail'),
+            'duration': info.get('duration'),
+            'webpage_url': info.get('webpage_url') or info.get('original_url'),
+            'stream_url': info['url'],
+            'acodec': info.get('acodec'),
+            'expires_at': parse_stream_expiry(info['url'])
+        }
+        self.entries[video_id] = entry
+        self.entries.move_to_end(video_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+        if self.storage:
+            row = (video_id, entry['title'], entry['thumbnail'], entry['duration'], entry['webpage_url'], int(time.time()))
+            self.touched.pop(video_id, None)
+            self.write(store_track_cache, row, self.max_size, self.take_touched())
+        return entry
+
+def is_playlist_url(url):
+    # watch?v=...&list=... plays just that video; only bare playlist links import the list
+    query = parse_qs(urlparse(url).query)
+    return 'list' in query and 'v' not in query
+
+def track_from_playlist_entry(entry):
+    # Built from a flat playlist entry; resolved like any other queued track when it comes up
+    video_id = entry.get('id') or entry.get('url')
+    thumbnails = entry.get('thumbnails') or []
+    thumbnail = thumbnails[-1]['url'] if thumbnails else None
+    if thumbnail is None and YOUTUBE_ID_RE.fullmatch(f"v={video_id}"):
+        thumbnail = f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
+    return Track(
+        video_id,
+        entry.get('title') or 'Unknown title',
+        thumbnail,
+        entry.get('duration'),
+        entry.get('webpage_url') or entry.get('url')
+    )
+
+def track_from_cache(entry):
+    return Track(entry['id'], entry['title'], entry['thumbnail'], entry['duration'], entry['webpage_url'])
+
+class ExtractionError(Exception):
+    # yt-dlp's DownloadError, re-raised so callers don't need yt_dlp imported to catch it
+    pass
+
+def import_yt_dlp():
+    # yt-dlp is slow to import and only needed once someone plays something, so it is
+    # imported on the extraction thread the first time it's used
+    import yt_dlp
+    return yt_dlp
+
+def run_extraction(url, opts):
+    # Runs on a worker thread
+    yt_dlp = import_yt_dlp()
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            return ydl.extract_info(url, download=False)
+    except yt_dlp.utils.DownloadError as e:
+        raise ExtractionError(str(e)) from e
+
+def stream_playlist(url, opts, on_entry, stop, limit):
+    # Runs on a worker thread. With process=False yt-dlp hands back the playlist's entries
+    # as a generator that fetches pages as it is iterated, so each entry is passed on as
+    # soon as its page arrives instead of after the whole playlist has been read.
+    yt_dlp = import_yt_dlp()
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+            title = info.get('title') or 'Playlist'
+            count = 0
+            for entry in info.get('entries') or []:
+                if stop.is_set() or count >= limit:
+                    break
+                if entry:
+                    on_entry(entry)
+                    count += 1
+            return title
+    except yt_dlp.utils.DownloadError as e:
+        raise ExtractionError(str(e)) from e
+
+class Extractor:
+    # Runs yt-dlp in a bounded thread pool so a slow lookup never blocks the event loop.
+    # Each guild can only hold EXTRACT_PER_GUILD workers at a time so one busy guild can't
+    # starve the rest, and a URL that is already being looked up shares that lookup.
+    def __init__(self, workers=EXTRACT_WORKERS, per_guild=EXTRACT_PER_GUILD, timeout=EXTRACT_TIMEOUT):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="yt-dlp")
+        self.per_guild = per_guild
+        self.timeout = timeout
+        self.guild_slots = {}  # guild_id -> asyncio.Semaphore
+        self.in_flight = {}    # (url, options) -> asyncio.Future
+
+    async def extract(self, guild_id, url, opts=YDL_OPTS):
+        key = (url, tuple(sorted(opts.items())))
+        future = self.in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._extract(guild_id, url, opts))
+            self.in_flight[key] = future
+            future.add_done_callback(lambda done: self._finished(key, done))
+        # Shield so one impatient caller being cancelled doesn't cancel the shared lookup
+        return await asyncio.shield(future)
+
+    def _finished(self, key, future):
+        self.in_flight.pop(key, None)
+        # Every waiter may have been cancelled already; read the error so it isn't reported as unretrieved
+        if not future.cancelled():
+            future.exception()
+
+    async def _extract(self, guild_id, url, opts):
+        slots = self.guild_slots.setdefault(guild_id, asyncio.Semaphore(self.per_guild))
+        loop = asyncio.get_running_loop()
+        # One deadline covers waiting for the guild's slot and the lookup itself, so a
+        # stuck lookup holding the slot makes the next one time out instead of queueing forever
+        deadline = loop.time() + self.timeout
+        await asyncio.wait_for(slots.acquire(), timeout=self.timeout)
+        work = loop.run_in_executor(self.executor, run_extraction, url, opts)
+        # The slot is released when the thread actually finishes, not when we stop waiting.
+        # A lookup that hangs past the timeout keeps counting against its guild, so a few
+        # stuck ones can't quietly take over the whole pool.
+        work.add_done_callback(lambda done: self._release(slots, done))
+        return await asyncio.wait_for(asyncio.shield(work), timeout=max(0.0, deadline - loop.time()))
+
+    @staticmethod
+    def _release(slots, work):
+        slots.release()
+        if not work.cancelled():
+            work.exception()  # nobody may be waiting on a timed-out lookup any more
+
+    async def stream_playlist(self, url, on_entry, stop, limit, opts=YDL_PLAYLIST_OPTS):
+        # Holds one pool worker but no guild slot, so the guild can still resolve
+        # its first track while the rest of the list is being read
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, stream_playlist, url, opts, on_entry, stop, limit)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def process_cpu_seconds(pid):
+    # utime + stime of a child process from /proc; None where /proc isn't available
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+class AudioStats:
+    # Per-guild playback counters. Written from the audio thread, read by /musicstats.
+    __slots__ = ("frames", "read_cpu", "ffmpeg_cpu", "passthrough", "transcoded", "sessions")
+
+    def __init__(self):
+        self.frames = 0         # 20ms Opus frames sent
+        self.read_cpu = 0.0     # audio-thread CPU seconds spent reading frames
+        self.ffmpeg_cpu = 0.0   # CPU seconds used by this guild's FFmpeg processes
+        self.passthrough = 0    # tracks copied straight through as Opus
+        self.transcoded = 0     # tracks FFmpeg had to encode
+        self.sessions = 0       # sources currently open (playing or prefetched)
+
+class MeteredSource(discord.AudioSource):
+    # Wraps an FFmpeg source and charges its read time and FFmpeg's CPU to the guild
+    def __init__(self, source, stats):
+        self.source = source
+        self.stats = stats
+        process = getattr(source, "_process", None)
+        self.pid = process.pid if process else None
+        self.cpu_seen = 0.0
+        self.closed = False
+        stats.sessions += 1
+
+    def read(self):
+        start = time.thread_time()
+        data = self.source.read()
+        self.stats.read_cpu += time.thread_time() - start
+        self.stats.frames += 1
+        if self.stats.frames % AUDIO_CPU_SAMPLE_FRAMES == 0:
+            self.sample_cpu()
+        return data
+
+    def is_opus(self):
+        return self.source.is_opus()
+
+    def sample_cpu(self):
+        if self.pid is None:
+            return
+        cpu = process_cpu_seconds(self.pid)
+        if cpu is not None and cpu > self.cpu_seen:
+            self.stats.ffmpeg_cpu += cpu - self.cpu_seen
+            self.cpu_seen = cpu
+
+    def cleanup(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.sample_cpu()  # last reading before the process is killed
+        self.stats.sessions -= 1
+        self.source.cleanup()
+
+def describe_audio_stats(stats):
+    played = stats.frames * 0.02
+    cpu = stats.read_cpu + stats.ffmpeg_cpu
+    share = cpu / played * 100 if played else 0.0
+    lines = [
+        f"Open streams: {stats.sessions}",
+        f"Played: {played / 60:.1f} min",
+        f"Audio thread CPU: {stats.read_cpu:.2f}s",
+        f"FFmpeg CPU: {stats.ffmpeg_cpu:.2f}s",
+        f"Passthrough / encoded: {stats.passthrough} / {stats.transcoded}",
+        f"CPU per stream: {share:.2f}% of a core",
+    ]
+    return "\n".join(lines), share
+
+async def open_audio_source(stream_url, acodec):
+    # Opus streams (YouTube's usual webm/opus) are copied through untouched; anything else
+    # is encoded to Opus by FFmpeg, so the Python audio thread never runs an encoder.
+    # Returns (source, passed_through).
+    codec = 'copy' if acodec == 'opus' else 'libopus'
+    bitrate = OPUS_BITRATE
+    if OPUS_PASSTHROUGH and acodec is None:
+        # yt-dlp didn't say; ask ffprobe (same as FFmpegOpusAudio.from_probe)
+        probed_codec, probed_bitrate = await discord.FFmpegOpusAudio.probe(stream_url)
+        # probe() reports the stream's own codec name, not the FFmpeg codec to use
+        codec = 'copy' if probed_codec in ('opus', 'libopus', 'copy') else 'libopus'
+        if codec == 'copy' and probed_bitrate:
+            bitrate = probed_bitrate
+    if not OPUS_PASSTHROUGH:
+        codec = 'libopus'
+    source = discord.FFmpegOpusAudio(
+        stream_url, codec=codec, bitrate=bitrate,
+        before_options=FFMPEG_BEFORE_OPTIONS, options=FFMPEG_OPTIONS
+    )
+    return source, codec == 'copy'
+
+class GuildPlayer:
+    # Owns one guild's playback. Slash commands and discord.py's audio thread only ever
+    # post messages to this task's inbox; it handles them one at a time, so queue pops and
+    # voice_client.play() can't interleave and a track can't be started twice.
+    def __init__(self, cog, guild_id):
+        self.cog = cog
+        self.bot = cog.bot
+        self.guild_id = guild_id
+        self.queue = get_queue(guild_id)
+        self.loop = asyncio.get_running_loop()
+        self.inbox = asyncio.Queue()
+        self.generation = 0  # bumped whenever a track starts; stale resolved/track-end events are ignored
+        self.current = None
+        self.resolving = None  # child task opening the current track's source
+        self.handlers = {
+            "enqueue": self.handle_enqueue,
+            "resolved": self.handle_resolved,
+            "track_end": self.handle_track_end,
+            "skip": self.handle_skip,
+            "pause": self.handle_pause,
+            "resume": self.handle_resume,
+            "leave": self.handle_leave,
+            "idle": self.handle_idle,
+        }
+        self.task = asyncio.create_task(self.run())
+
+    @property
+    def voice_client(self):
+        guild = self.bot.get_guild(self.guild_id)
+        return guild.voice_client if guild else None
+
+    def submit(self, command, *args):
+        """Queue a command for the player; the returned future resolves with its result."""
+        future = self.loop.create_future()
+        self.inbox.put_nowait((command, args, future))
+        return future
+
+    def on_track_end(self, generation, error):
+        # Runs on the audio thread: just hand the event over to the loop
+        self.loop.call_soon_threadsafe(self.inbox.put_nowait, ("track_end", (generation, error), None))
+
+    def stop(self):
+        self.cancel_resolve()
+        self.task.cancel()
+
+    async def run(self):
+        while True:
+            command, args, future = await self.inbox.get()
+            try:
+                result = await self.handlers[command](*args)
+            except Exception as e:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+                else:
+                    log.exception("Player failed on %s: %s", command, e, extra=fields(guild_id=self.guild_id))
+            else:
+                if future is not None and not future.done():
+                    future.set_result(result)
+
+    def announce(self, embed):
+        text_channel = self.bot.text_channels.get(self.guild_id)
+        if text_channel:
+            # Don't hold up the next command on a Discord round-trip
+            self.cog.spawn(text_channel.send(embed=embed))
+
+    def begin(self, track, source=None, announce=False):
+        # Resolving a track can take a while (yt-dlp, then ffprobe), so it runs in a child task
+        # that posts "resolved" back to the inbox. Skip/leave are handled in the meantime and
+        # simply bump the generation, which makes the pending result stale.
+        if self.voice_client is None:
+            if source is not None:
+                source.cleanup()
+            return False
+
+        self.generation += 1
+        self.current = track
+        self.cog.idle_timers.cancel(self.guild_id)
+        if source is not None:
+            self.play(self.generation, track, source, announce)
+        else:
+            self.resolving = asyncio.create_task(self.resolve(self.generation, track, announce))
+        return True
+
+    async def resolve(self, generation, track, announce):
+        try:
+            source = await self.cog.open_source(self.guild_id, track)
+        except Exception as e:
+            self.inbox.put_nowait(("resolved", (generation, track, None, e, announce), None))
+        else:
+            self.inbox.put_nowait(("resolved", (generation, track, source, None, announce), None))
+
+    def cancel_resolve(self):
+        if self.resolving:
+            self.resolving.cancel()
+            self.resolving = None
+
+    def play(self, generation, track, source, announce):
+        voice_client = self.voice_client
+        if voice_client is None:
+            source.cleanup()  # disconnected while resolving
+            self.current = None
+            return
+
+        voice_client.play(source, after=lambda e: self.on_track_end(generation, e))
+        self.cog.start_prefetch(self.guild_id)
+        if announce:
+            embed = Embed(title='Now Playing', description=track.title, color=discord.Color.green())
+            embed.set_thumbnail(url=track.thumbnail)
+            self.announce(embed)
+
+    def advance(self):
+        if self.queue and self.voice_client:
+            track = self.queue.popleft()
+            self.begin(track, self.cog.take_prefetched_source(self.guild_id, track), announce=True)
+            return
+
+        # Queue ran dry: leave after IDLE_TIMEOUT unless something starts playing first
+        self.current = None
+        if self.voice_client:
+            self.cog.idle_timers.schedule(self.guild_id, lambda: self.submit("idle"), delay=IDLE_TIMEOUT)
+
+    def is_idle(self):
+        voice_client = self.voice_client
+        return (
+            voice_client is not None and self.resolving is None
+            and not voice_client.is_playing() and not voice_client.is_paused()
+        )
+
+    # --- Commands (only ever run on the player task) ---
+    async def handle_enqueue(self, track):
+        if self.is_idle() and not self.queue:
+            if self.begin(track):
+                return "playing"
+        self.queue.append(track)
+        if self.is_idle():
+            self.advance()
+        elif len(self.queue) <= PREFETCH_WINDOW:
+            self.cog.start_prefetch(self.guild_id)
+        return "queued"
+
+    async def handle_resolved(self, generation, track, source, error, announce):
+        if generation != self.generation:
+            # Skipped or left while it was resolving
+            if source is not None:
+                source.cleanup()
+            return
+        self.resolving = None
+        if error is not None:
+            log.warning("Could not resolve %s: %s", track.title, error, extra=fields(guild_id=self.guild_id))
+            self.announce(Embed(title="⚠️ Skipped", description=f"Couldn't load **{track.title}**.", color=discord.Color.red()))
+            self.current = None
+            self.advance()
+            return
+        self.play(generation, track, source, announce)
+
+    async def handle_track_end(self, generation, error):
+        if error:
+            log.error("Playback error: %s", error, extra=fields(guild_id=self.guild_id))
+        if generation != self.generation:
+            return  # from a track that was already replaced or torn down
+        self.current = None
+        self.advance()
+
+    async def handle_skip(self):
+        if self.resolving:
+            # Nothing is audible yet; drop the track that's still loading and move on
+            self.generation += 1
+            self.cancel_resolve()
+            self.cog.cancel_prefetch(self.guild_id)
+            self.advance()
+            return True
+        voice_client = self.voice_client
+        if not voice_client or not (voice_client.is_playing() or voice_client.is_paused()):
+            return False
+        # Stop any lookahead still in flight; the track-end event starts a fresh one for the new head
+        self.cog.cancel_prefetch(self.guild_id)
+        voice_client.stop()
+        return True
+
+    async def handle_pause(self):
+        voice_client = self.voice_client
+        if voice_client and voice_client.is_playing():
+            voice_client.pause()
+            return True
+        return False
+
+    async def handle_resume(self):
+        voice_client = self.voice_client
+        if voice_client and voice_client.is_paused():
+            voice_client.resume()
+            return True
+        return False
+
+    async def handle_leave(self):
+        voice_client = self.voice_client
+        if not voice_client:
+            return False
+        self.generation += 1  # the stop() below fires one last track-end; ignore it
+        self.cancel_resolve()
+        self.current = None
+        await voice_client.disconnect()
+        self.cog.reset_guild(self.guild_id)
+        return True
+
+    async def handle_idle(self):
+        # Playback normally cancels the timer; this just guards against anything that slipped past
+        if not self.is_idle() or self.queue:
+            return
+        await self.handle_leave()
+        self.announce(Embed(
+            title="Jeng has ran away.",
+            description=f"No music playing — disconnected automatically after {IDLE_TIMEOUT:g} seconds.",
+            color=discord.Color.purple()
+        ))
+
+
 class Music(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.bot.text_channels = {}
+        self.extractor = Extractor()
+        self.tracks = TrackCache(bot.storage if TRACK_CACHE_PERSIST else None)
+        self.prefetch_tasks = {}       # guild_id -> asyncio.Task
+        self.prefetched_sources = {}   # guild_id -> (track, FFmpeg source already connecting)
+        self.playlist_imports = {}     # guild_id -> (asyncio.Task, threading.Event)
+        self.idle_timers = DeadlineScheduler("music")  # one timer task for every idle guild
+        self.players = {}              # guild_id -> GuildPlayer
+        self.background = set()        # fire-and-forget tasks (announcements, playlist imports)
+        self.audio_stats = {}          # guild_id -> AudioStats
+
+    async def cog_load(self):
+        await self.tracks.load()
+        self.idle_timers.start()
+
+    async def cog_unload(self):
+        await self.idle_timers.stop()
+        for player in self.players.values():
+            player.stop()
+        self.players.clear()
+        for guild_id in list(self.playlist_imports):
+            self.cancel_playlist_import(guild_id)
+        for guild_id in list(self.prefetch_tasks):
+            self.cancel_prefetch(guild_id, drop_source=True)
+        self.extractor.shutdown()
+        await self.tracks.flush()
+
+    def get_player(self, guild_id):
+        player = self.players.get(guild_id)
+        if player is None:
+            player = self.players[guild_id] = GuildPlayer(self, guild_id)
+        return player
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+    def reset_guild(self, guild_id):
+        # Everything that should go away once the bot leaves voice
+        get_queue(guild_id).clear()
+        self.idle_timers.cancel(guild_id)
+        self.cancel_playlist_import(guild_id)
+        self.cancel_prefetch(guild_id, drop_source=True)
+
+    # --- Prefetch ---
+    def start_prefetch(self, guild_id):
+        # Resolve the next PREFETCH_WINDOW songs while the current one plays so the
+        # track change doesn't wait on yt-dlp (and optionally not on FFmpeg either)
+        self.cancel_prefetch(guild_id)
+        if PREFETCH_WINDOW > 0 and get_queue(guild_id):
+            self.prefetch_tasks[guild_id] = asyncio.create_task(self.prefetch(guild_id))
+
+    def cancel_prefetch(self, guild_id, drop_source=False):
+        task = self.prefetch_tasks.pop(guild_id, None)
+        if task:
+            task.cancel()
+        if drop_source:
+            self.cancel_prefetch_source(guild_id)
+
+    def cancel_prefetch_source(self, guild_id):
+        prefetched = self.prefetched_sources.pop(guild_id, None)
+        if prefetched:
+            prefetched[1].cleanup()
+
+    async def prefetch(self, guild_id):
+        upcoming = get_queue(guild_id).peek(PREFETCH_WINDOW)
+        for index, song in enumerate(upcoming):
+            try:
+                await self.get_stream_url(guild_id, song)
+                if index == 0 and PREFETCH_OPEN_SOURCE:
+                    current = self.prefetched_sources.get(guild_id)
+                    if current is None or current[0] is not song:
+                        source = await self.open_source(guild_id, song)
+                        self.cancel_prefetch_source(guild_id)
+                        self.prefetched_sources[guild_id] = (song, source)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Prefetch failed for %s: %s", song.title, e, extra=fields(guild_id=guild_id))
+
+    def take_prefetched_source(self, guild_id, song):
+        prefetched = self.prefetched_sources.pop(guild_id, None)
+        if prefetched is None:
+            return None
+        if prefetched[0] is song:
+            return prefetched[1]
+        prefetched[1].cleanup()  # queue changed since it was opened
+        return None
+
+    # --- Playlists ---
+    def cancel_playlist_import(self, guild_id):
+        running = self.playlist_imports.pop(guild_id, None)
+        if running:
+            task, stop = running
+            stop.set()
+            task.cancel()
+
+    async def import_playlist(self, interaction, url):
+        try:
+            await self.run_playlist_import(interaction, url)
+        except Exception as e:
+            # Runs as a background task, so nothing else would ever see this error
+            log.exception("Playlist import failed: %s", e, extra=fields(guild_id=interaction.guild.id))
+            embed = Embed(
+                title="❌ Playlist Import Stopped",
+                description="Something went wrong while importing. Tracks added so far stay in the queue.",
+                color=discord.Color.red()
+            )
+            try:
+                await interaction.followup.send(embed=embed)
+            except discord.HTTPException:
+                pass  # the interaction token may have expired by now
+
+    async def run_playlist_import(self, interaction, url):
+        guild_id = interaction.guild.id
+        loop = asyncio.get_running_loop()
+        entries = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
 
-    @app_commands.command(name="play", description="Plays a song from a YouTube URL.")
-    @app_commands.describe(url="YouTube URL")
+        def on_entry(entry):
+            loop.call_soon_threadsafe(entries.put_nowait, entry)
+
+        async def read_playlist():
+            try:
+                return await self.extractor.stream_playlist(url, on_entry, stop, PLAYLIST_MAX_TRACKS)
+            finally:
+                loop.call_soon_threadsafe(entries.put_nowait, done)
+
+        reader = asyncio.create_task(read_playlist())
+        self.cancel_playlist_import(guild_id)
+        self.playlist_imports[guild_id] = (asyncio.current_task(), stop)
+
+        message = None
+        added = 0
+        try:
+            while True:
+                entry = await entries.get()
+                if entry is done:
+                    break
+
+                song = track_from_playlist_entry(entry)
+                # Only a track that starts playing right away is resolved up front
+                try:
+                    result = await self.get_player(guild_id).submit("enqueue", song)
+                except Exception as e:
+                    log.warning("Could not resolve %s: %s", song.title, e, extra=fields(guild_id=guild_id))
+                    continue
+                status = "Now playing" if result == "playing" else "Queued"
+                added += 1
+
+                if added == 1:
+                    embed = Embed(title="📥 Importing Playlist", description=f"{status} **{song.title}**\nAdding the rest in the background...", color=discord.Color.blue())
+                    embed.set_thumbnail(url=song.thumbnail)
+                    message = await interaction.followup.send(embed=embed, wait=True)
+                elif added % PLAYLIST_PROGRESS_EVERY == 0 and message:
+                    embed = Embed(title="📥 Importing Playlist", description=f"Added **{added}** tracks so far...", color=discord.Color.blue())
+                    await message.edit(embed=embed)
+
+            title = await reader
+        except ExtractionError as e:
+            embed = Embed(title="❌ Playlist Error", description=f"Couldn't read that playlist.\n`{e}`", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
+        finally:
+            stop.set()
+            if not reader.done():
+                reader.cancel()
+            if self.playlist_imports.get(guild_id, (None,))[0] is asyncio.current_task():
+                del self.playlist_imports[guild_id]
+
+        if added == 0:
+            embed = Embed(title="❌ Empty Playlist", description="No playable tracks were found.", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
+
+        capped = " (limit reached)" if added >= PLAYLIST_MAX_TRACKS else ""
+        embed = Embed(title="✅ Playlist Added", description=f"Added **{added}** tracks from **{title}**{capped}.", color=discord.Color.green())
+        if message:
+            await message.edit(embed=embed)
+        else:
+            await interaction.followup.send(embed=embed)
+
+    async def lookup(self, guild_id, url):
+        # Cached metadata answers /play for known videos without running yt-dlp at all
+        video_id = parse_video_id(url)
+        entry = self.tracks.get(video_id) if video_id else None
+        if entry:
+            return entry
+        info = await self.extractor.extract(guild_id, url)
+        return self.tracks.put(info)
+
+    async def get_stream_url(self, guild_id, song):
+        # Signed stream URLs expire, so resolve again if the cached one is stale
+        stream_url = self.tracks.fresh_stream_url(song.id)
+        if stream_url:
+            return stream_url
+        info = await self.extractor.extract(guild_id, song.webpage_url or song.id)
+        return self.tracks.put(info)['stream_url']
+
+    async def open_source(self, guild_id, song):
+        stream_url = await self.get_stream_url(guild_id, song)
+        source, passthrough = await open_audio_source(stream_url, self.tracks.codec(song.id))
+        stats = self.audio_stats.setdefault(guild_id, AudioStats())
+        if passthrough:
+            stats.passthrough += 1
+        else:
+            stats.transcoded += 1
+        return MeteredSource(source, stats)
+
+    @app_commands.command(name="play", description="Plays a song or playlist from a YouTube URL.")
+    @app_commands.describe(url="YouTube video or playlist URL")
     async def play(self, interaction: Interaction, url: str):
         debug_command("play", interaction.user, url=url)
         await interaction.response.defer()
         guild_id = interaction.guild.id
         self.bot.text_channels[guild_id] = interaction.channel
-    
-        if guild_id not in queues:
-            queues[guild_id] = []
-
-        ydl_opts = {
-            'format': 'bestaudio',
-            'noplaylist': True,
-            'cookiefile': 'cookies.txt'
-        }
+
+        if is_playlist_url(url):
+            if not interaction.guild.voice_client:
+                await interaction.user.voice.channel.connect()
+            # Runs as its own task so /leave can cancel it without touching this interaction
+            self.spawn(self.import_playlist(interaction, url))
+            return
 
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                song = {
-                    'url': info['url'],
-                    'title': info['title'],
-                    'thumbnail': info['thumbnail']
-                }
-        except yt_dlp.utils.DownloadError as e:
+            song = track_from_cache(await self.lookup(guild_id, url))
+            if not interaction.guild.voice_client:
+                await interaction.user.voice.channel.connect()
+            # The player decides whether this starts now or waits its turn
+            result = await self.get_player(guild_id).submit("enqueue", song)
+        except asyncio.TimeoutError:
+            embed = Embed(
+                title="⏱️ Lookup Timed Out",
+                description="YouTube took too long to respond. Please try again.",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed)
+            return
+        except ExtractionError as e:
             if "sign in" in str(e).lower() or "cookies" in str(e).lower():
                 embed = Embed(
                     title="🍪 YouTube Cookie Error",
@@ -96,70 +1012,17 @@ class Music(commands.Cog):
                 raise e
 
 
-        voice_client = interaction.guild.voice_client
-        if not voice_client:
-            voice_client = await interaction.user.voice.channel.connect()
-
-        if not voice_client.is_playing():
-            voice_client.play(discord.FFmpegPCMAudio(song['url']), after=lambda e: self.play_next(guild_id))
-            embed = Embed(title='Now Playing', description=song['title'], color=discord.Color.green())
-            embed.set_thumbnail(url=song['thumbnail'])
-            await interaction.followup.send(embed=embed)
+        if result == "playing":
+            embed = Embed(title='Now Playing', description=song.title, color=discord.Color.green())
         else:
-            queues[guild_id].append(song)
-            embed = Embed(title='Added to Queue', description=song['title'], color=discord.Color.blue())
-            embed.set_thumbnail(url=song['thumbnail'])
-            await interaction.followup.send(embed=embed)
-
-    def play_next(self, guild_id):
-        voice_client = self.bot.get_guild(guild_id).voice_client
-        text_channel = self.bot.text_channels.get(guild_id)
-
-        if queues[guild_id]:
-            next_song = queues[guild_id].pop(0)
-            voice_client.play(
-                discord.FFmpegPCMAudio(next_song['url']),
-                after=lambda e: self.play_next(guild_id)
-            )
-            embed = Embed(title='Now Playing', description=next_song['title'], color=discord.Color.green())
-            embed.set_thumbnail(url=next_song['thumbnail'])
-            if text_channel:
-                asyncio.run_coroutine_threadsafe(text_channel.send(embed=embed), self.bot.loop)
-        else:
-            asyncio.run_coroutine_threadsafe(self.auto_disconnect(guild_id), self.bot.loop)
-
-
-    async def auto_disconnect(self, guild_id):
-        guild = self.bot.get_guild(guild_id)
-        vc = guild.voice_client
-
-        if not vc:
-            return
-
-        for _ in range(60):  # check once per second for 60 seconds
-            if vc.is_playing() or queues[guild_id]:  # if it's playing or new song added
-                return  # cancel the disconnect
-            await asyncio.sleep(1)
-
-        # Still not playing after 60s → disconnect
-        await vc.disconnect()
-        queues[guild_id] = []
-
-        embed = Embed(
-            title="Jeng has ran away.",
-            description="No music playing — disconnected automatically after 60 seconds.",
-            color=discord.Color.purple()
-        )
-        text_channel = self.bot.text_channels.get(guild_id)
-        if text_channel:
-            await text_channel.send(embed=embed)
-
-
+            embed = Embed(title='Added to Queue', description=song.title, color=discord.Color.blue())
+        embed.set_thumbnail(url=song.thumbnail)
+        await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="queue", description="Shows the current music queue.")
     async def queue(self, interaction: Interaction):
         debug_command("queue", interaction.user)
-        song_queue = queues.get(interaction.guild.id, [])
+        song_queue = get_queue(interaction.guild.id)
         if not song_queue:
             embed = Embed(title="Queue Empty", description="No songs in queue.", color=discord.Color.red())
             await interaction.response.send_message(embed=embed)
@@ -168,50 +1031,114 @@ class Music(commands.Cog):
         embed = view.format_embed()
         await interaction.response.send_message(embed=embed, view=view)
 
+    @app_commands.command(name="remove", description="Removes a song from the queue.")
+    @app_commands.describe(position="Queue position of the song to remove")
+    async def remove(self, interaction: Interaction, position: int):
+        debug_command("remove", interaction.user, position=position)
+        song_queue = get_queue(interaction.guild.id)
+        if position < 1 or position > len(song_queue):
+            embed = Embed(title="❌ Invalid Position", description=f"Pick a number between 1 and {len(song_queue)}.", color=discord.Color.red())
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        track = song_queue.remove(position - 1)
+        if position <= PREFETCH_WINDOW:
+            self.start_prefetch(interaction.guild.id)
+        embed = Embed(title="🗑️ Removed", description=track.title, color=discord.Color.orange())
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="move", description="Moves a song to a different spot in the queue.")
+    @app_commands.describe(position="Current queue position", new_position="Where to move it")
+    async def move(self, interaction: Interaction, position: int, new_position: int):
+        debug_command("move", interaction.user, position=position, new_position=new_position)
+        song_queue = get_queue(interaction.guild.id)
+        if not (1 <= position <= len(song_queue) and 1 <= new_position <= len(song_queue)):
+            embed = Embed(title="❌ Invalid Position", description=f"Pick numbers between 1 and {len(song_queue)}.", color=discord.Color.red())
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        track = song_queue.move(position - 1, new_position - 1)
+        if min(position, new_position) <= PREFETCH_WINDOW:
+            self.start_prefetch(interaction.guild.id)
+        embed = Embed(title="↕️ Moved", description=f"**{track.title}** is now #{new_position}.", color=discord.Color.blue())
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="shuffle", description="Shuffles the queue.")
+    async def shuffle(self, interaction: Interaction):
+        debug_command("shuffle", interaction.user)
+        song_queue = get_queue(interaction.guild.id)
+        if not song_queue:
+            embed = Embed(title="Queue Empty", description="No songs in queue.", color=discord.Color.red())
+            await interaction.response.send_message(embed=embed)
+            return
+        song_queue.shuffle()
+        self.start_prefetch(interaction.guild.id)
+        embed = Embed(title="🔀 Shuffled", description=f"Shuffled {len(song_queue)} songs.", color=discord.Color.blue())
+        await interaction.response.send_message(embed=embed)
+
+    async def submit_deferred(self, interaction, command):
+        # The player may be busy resolving a track for a while; acknowledge the
+        # interaction first so it doesn't expire while this waits its turn
+        await interaction.response.defer()
+        return await self.get_player(interaction.guild.id).submit(command)
+
     @app_commands.command(name="skip", description="Skips the current song.")
     async def skip(self, interaction: Interaction):
         debug_command("skip", interaction.user)
-        if interaction.guild.voice_client and interaction.guild.voice_client.is_playing():
-            interaction.guild.voice_client.stop()
+        if await self.submit_deferred(interaction, "skip"):
             embed = Embed(title="Skipped", description="Skipped to the next song.", color=discord.Color.orange())
-            await interaction.response.send_message(embed=embed)
+            await interaction.followup.send(embed=embed)
         else:
             embed = Embed(title="No Song Playing", description="Nothing to skip.", color=discord.Color.red())
-            await interaction.response.send_message(embed=embed)
+            await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="stop", description="Pauses the music.")
     async def stop(self, interaction: Interaction):
         debug_command("stop", interaction.user)
-        if interaction.guild.voice_client and interaction.guild.voice_client.is_playing():
-            interaction.guild.voice_client.pause()
+        if await self.submit_deferred(interaction, "pause"):
             embed = Embed(title="Paused", description="Music paused.", color=discord.Color.orange())
-            await interaction.response.send_message(embed=embed)
+            await interaction.followup.send(embed=embed)
         else:
             embed = Embed(title="No Music Playing", description="Nothing to pause.", color=discord.Color.red())
-            await interaction.response.send_message(embed=embed)
+            await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="start", description="Resumes paused music.")
     async def start(self, interaction: Interaction):
         debug_command("start", interaction.user)
-        if interaction.guild.voice_client and interaction.guild.voice_client.is_paused():
-            interaction.guild.voice_client.resume()
+        if await self.submit_deferred(interaction, "resume"):
             embed = Embed(title="Resumed", description="Music resumed.", color=discord.Color.green())
-            await interaction.response.send_message(embed=embed)
+            await interaction.followup.send(embed=embed)
         else:
             embed = Embed(title="Not Paused", description="Nothing is paused.", color=discord.Color.red())
-            await interaction.response.send_message(embed=embed)
+            await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="leave", description="Disconnects from voice and clears queue.")
     async def leave(self, interaction: Interaction):
         debug_command("leave", interaction.user)
-        if interaction.guild.voice_client:
-            await interaction.guild.voice_client.disconnect()
-            queues[interaction.guild.id] = []
+        if await self.submit_deferred(interaction, "leave"):
             embed = Embed(title="Jeng has ran away.", description="Left the voice channel.", color=discord.Color.purple())
-            await interaction.response.send_message(embed=embed)
+            await interaction.followup.send(embed=embed)
         else:
             embed = Embed(title="Not Connected", description="I'm not in a voice channel.", color=discord.Color.red())
-            await interaction.response.send_message(embed=embed)
+            await interaction.followup.send(embed=embed)
+
+    @app_commands.command(name="musicstats", description="Shows how much CPU voice playback is using.")
+    async def musicstats(self, interaction: Interaction):
+        debug_command("musicstats", interaction.user)
+        embed = Embed(title="📊 Music Stats", color=discord.Color.blue())
+
+        guild_stats = self.audio_stats.get(interaction.guild.id)
+        if guild_stats:
+            embed.add_field(name="This server", value=describe_audio_stats(guild_stats)[0], inline=False)
+
+        total = AudioStats()
+        for stats in self.audio_stats.values():
+            for field in AudioStats.__slots__:
+                setattr(total, field, getattr(total, field) + getattr(stats, field))
+        summary, share = describe_audio_stats(total)
+        if share:
+            # Rough ceiling from measured CPU per stream; ignores network and gateway load
+            summary += f"\nEstimated capacity: ~{int(100 * (os.cpu_count() or 1) / share)} streams on this host"
+        embed.add_field(name=f"All servers ({len(self.audio_stats)})", value=summary, inline=False)
+        await interaction.response.send_message(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Music(bot))
@@ -1,32 +1,350 @@
 import discord
 from discord.ext import commands
-from discord import app_commands, Interaction, Embed
-import asyncio
-from datetime import datetime
-import pytz
-
-# --- Color Codes ---
-GREEN = "\033[92m"
-YELLOW = "\033[93m"
-CYAN = "\033[96m"
-RESET = "\033[0m"
-
-def debug_command(name, user, **kwargs):
-    print(f"{GREEN}[COMMAND] /{name}{RESET} triggered by {YELLOW}{user.display_name}{RESET}")
-    if kwargs:
-        print(f"{CYAN}Input:{RESET}")
-        for key, value in kwargs.items():
-            print(f"  {key}: {value}")
+from discord import app_commands, Interaction, Embed, ui
+import json
+import os
+import time
+from datetime import datetime, timezone
+from utils.scheduler import DeadlineScheduler
+from utils.users import UserResolver
+from utils.edits import EditCoalescer, FIELD_LIMIT, join_limited
+from utils.debug import debug_command
+from utils.log import fields, get_logger
+from utils.metrics import metrics, timed_listener
+
+log = get_logger("polls")
+
+# --- Live Tally Settings ---
+POLL_EDIT_INTERVAL = float(os.getenv("POLL_EDIT_INTERVAL", "5"))  # min seconds between live count edits per poll
+POLL_CLOSE_RETRY = float(os.getenv("POLL_CLOSE_RETRY", "60"))      # seconds before retrying a close that failed
+
+MAX_OPTIONS = 6
+
+class Poll:
+    # One open poll, mirrored from the polls and poll_votes tables
+    __slots__ = ("message_id", "guild_id", "channel_id", "creator_id", "creator_name",
+                 "question", "options", "anonymous", "closes_at", "buttons",
+                 "emoji_index", "votes", "reactions", "counts", "resync", "view")
+
+    def __init__(self, message_id, guild_id, channel_id, creator_id, creator_name, question, options, anonymous, closes_at, buttons=False):
+        self.message_id = message_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.creator_id = creator_id
+        self.creator_name = creator_name
+        self.question = question
+        self.options = options  # [(text, emoji), ...]
+        self.anonymous = anonymous
+        self.closes_at = closes_at
+        self.buttons = buttons           # voted through PollVoteView instead of reactions
+        self.emoji_index = {emoji: i for i, (_, emoji) in enumerate(options)}
+        self.votes = {}                  # user_id -> the option index that counts
+        self.reactions = {}              # user_id -> [option index, ...] in the order they reacted
+        self.counts = [0] * len(options)
+        self.resync = False              # reactions may have been missed while the bot was down
+        self.view = None                 # the PollVoteView sent with a button poll, until it closes
+
+    def add_vote(self, user_id, index):
+        # Every reaction is remembered, but only a user's earliest remaining one counts.
+        # Returns False if this reaction was already known.
+        reacted = self.reactions.setdefault(user_id, [])
+        if index in reacted:
+            return False
+        reacted.append(index)
+        if user_id not in self.votes:
+            self.votes[user_id] = index
+            self.counts[index] += 1
+        return True
+
+    def remove_vote(self, user_id, index):
+        # Taking back the reaction that counted hands the vote to their next one, if any
+        reacted = self.reactions.get(user_id)
+        if not reacted or index not in reacted:
+            return False
+        reacted.remove(index)
+        if not reacted:
+            del self.reactions[user_id]
+        if self.votes.get(user_id) == index:
+            self.counts[index] -= 1
+            if reacted:
+                self.votes[user_id] = reacted[0]
+                self.counts[reacted[0]] += 1
+            else:
+                del self.votes[user_id]
+        return True
+
+    def set_vote(self, user_id, index):
+        # Button polls let people change their mind
+        previous = self.votes.get(user_id)
+        if previous == index:
+            return False
+        if previous is not None:
+            self.counts[previous] -= 1
+        self.votes[user_id] = index
+        self.counts[index] += 1
+        return True
+
+    def to_row(self):
+        return (
+            self.message_id, self.guild_id, self.channel_id, self.creator_id, self.creator_name,
+            self.question, json.dumps(self.options), int(self.anonymous), self.closes_at, int(self.buttons)
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        message_id, guild_id, channel_id, creator_id, creator_name, question, options, anonymous, closes_at, buttons = row
+        return cls(
+            message_id, guild_id, channel_id, creator_id, creator_name,
+            question, [tuple(option) for option in json.loads(options)], bool(anonymous), closes_at, bool(buttons)
+        )
+
+POLL_COLUMNS = "message_id, guild_id, channel_id, creator_id, creator_name, question, options, anonymous, closes_at, buttons"
+
+def poll_embed(poll):
+    embed = Embed(title="📊 Poll", description=poll.question, color=discord.Color.blurple())
+    for (text, emoji), count in zip(poll.options, poll.counts):
+        embed.add_field(name=f"{emoji} {text}", value=f"{count} vote(s)", inline=False)
+    embed.set_footer(text=f"Created by {poll.creator_name} • Closes")
+    embed.timestamp = datetime.fromtimestamp(poll.closes_at, tz=timezone.utc)
+    return embed
+
+class PollVoteView(ui.View):
+    # Persistent: custom_ids are the same for every poll ("poll:vote:<option>"), so one
+    # instance registered with bot.add_view handles clicks on any poll, even after a restart.
+    # The poll itself is looked up from the clicked message's ID.
+    def __init__(self, cog, options=None, emojis=True):
+        super().__init__(timeout=None)
+        self.cog = cog
+        for index in range(len(options) if options else MAX_OPTIONS):
+            text, emoji = options[index] if options else (str(index + 1), None)
+            button = ui.Button(
+                label=text[:80],
+                emoji=emoji if emojis else None,
+                style=discord.ButtonStyle.blurple,
+                custom_id=f"poll:vote:{index}"
+            )
+            button.callback = self.make_callback(index)
+            self.add_item(button)
+
+    def make_callback(self, index):
+        async def callback(interaction: Interaction):
+            await self.cog.button_vote(interaction, index)
+        return callback
 
 class Polls(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.storage = bot.storage
+        self.users = UserResolver(bot)
+        self.polls = {}  # message_id -> Poll
+        self.edits = EditCoalescer("polls", POLL_EDIT_INTERVAL)
+        # Every open poll shares this one timer task, however long it runs for
+        self.closer = DeadlineScheduler("polls")
+
+    async def cog_load(self):
+        self.bot.add_view(PollVoteView(self))
+        rows = await self.storage.fetchall(f"SELECT {POLL_COLUMNS} FROM polls WHERE closed = 0")
+        for row in rows:
+            poll = Poll.from_row(row)
+            poll.resync = not poll.buttons  # button clicks can't happen while we're offline
+            self.polls[poll.message_id] = poll
+        for message_id, user_id, option in await self.storage.fetchall(
+            "SELECT v.message_id, v.user_id, v.option FROM poll_votes v JOIN polls p ON p.message_id = v.message_id "
+            "WHERE p.closed = 0 ORDER BY v.voted_at"
+        ):
+            self.polls[message_id].add_vote(user_id, option)
+        for poll in list(self.polls.values()):
+            self.track(poll)
+        self.closer.start()
+        if rows:
+            log.info("Restored %d open poll(s)", len(rows))
+
+        metrics.register_gauges("polls", lambda: {"open": len(self.polls)})
+
+    async def cog_unload(self):
+        metrics.unregister_gauges("polls")
+        await self.closer.stop()
+        self.edits.close()
+        for poll in self.polls.values():
+            if poll.view:
+                poll.view.stop()  # the persistent view takes over their clicks after a reload
+
+    def track(self, poll):
+        self.polls[poll.message_id] = poll
+        # Deadlines that passed while the bot was down fire straight away
+        self.closer.schedule(poll.message_id, lambda: self.close_poll(poll.message_id), at=poll.closes_at)
+
+    # --- Live tally ---
+    def reaction_vote(self, payload):
+        poll = self.polls.get(payload.message_id)
+        if poll is None or poll.buttons or payload.user_id == self.bot.user.id:
+            return None, None
+        return poll, poll.emoji_index.get(str(payload.emoji))
+
+    @commands.Cog.listener()
+    @timed_listener("polls.on_raw_reaction_add")
+    async def on_raw_reaction_add(self, payload):
+        poll, index = self.reaction_vote(payload)
+        if index is None or (payload.member and payload.member.bot):
+            return
+        if poll.add_vote(payload.user_id, index):
+            self.schedule_live_edit(poll)
+            await self.storage.execute(
+                "INSERT OR IGNORE INTO poll_votes (message_id, user_id, option, voted_at) VALUES (?, ?, ?, ?)",
+                (poll.message_id, payload.user_id, index, time.time())
+            )
+
+    @commands.Cog.listener()
+    @timed_listener("polls.on_raw_reaction_remove")
+    async def on_raw_reaction_remove(self, payload):
+        poll, index = self.reaction_vote(payload)
+        if index is None:
+            return
+        if poll.remove_vote(payload.user_id, index):
+            self.schedule_live_edit(poll)
+            await self.storage.execute(
+                "DELETE FROM poll_votes WHERE message_id = ? AND user_id = ? AND option = ?",
+                (poll.message_id, payload.user_id, index)
+            )
+
+    async def button_vote(self, interaction, index):
+        poll = self.polls.get(interaction.message.id)
+        if poll is None or index >= len(poll.options):
+            await interaction.response.send_message("This poll is closed.", ephemeral=True)
+            return
+
+        text, emoji = poll.options[index]
+        if not poll.set_vote(interaction.user.id, index):
+            await interaction.response.send_message(f"You already voted for {emoji} **{text}**.", ephemeral=True)
+            return
+
+        # One response per vote; the public count catches up with the next debounced edit
+        await interaction.response.send_message(f"🗳️ Voted for {emoji} **{text}**.", ephemeral=True)
+        self.schedule_live_edit(poll)
+
+        def store(conn, message_id, user_id):
+            # Button polls keep a single row per user
+            conn.execute("DELETE FROM poll_votes WHERE message_id = ? AND user_id = ?", (message_id, user_id))
+            conn.execute(
+                "INSERT INTO poll_votes (message_id, user_id, option, voted_at) VALUES (?, ?, ?, ?)",
+                (message_id, user_id, index, time.time())
+            )
+        await self.storage.transaction(store, poll.message_id, interaction.user.id)
+
+    def schedule_live_edit(self, poll):
+        # Coalesced: a burst of votes turns into one edit at most every POLL_EDIT_INTERVAL
+        channel = self.bot.get_channel(poll.channel_id)
+        if channel is not None:
+            self.edits.request(channel.get_partial_message(poll.message_id), lambda: {"embed": poll_embed(poll)})
+
+    async def resync_reactions(self, poll, msg):
+        # Only for polls that lived through a restart: reconcile with the reactions actually
+        # on the message, both ones added and ones taken off while we weren't listening.
+        # Reactions we already knew about keep their place in line.
+        present = set()
+        for reaction in msg.reactions:
+            index = poll.emoji_index.get(str(reaction.emoji))
+            if index is None:
+                continue
+            async for user in reaction.users():
+                if not user.bot:
+                    present.add((user.id, index))
+
+        removed = [
+            (user_id, index)
+            for user_id, reacted in poll.reactions.items()
+            for index in reacted
+            if (user_id, index) not in present
+        ]
+        for user_id, index in removed:
+            poll.remove_vote(user_id, index)
+        now = time.time()
+        added = [(user_id, index) for user_id, index in sorted(present) if poll.add_vote(user_id, index)]
+
+        def store(conn):
+            conn.executemany(
+                "DELETE FROM poll_votes WHERE message_id = ? AND user_id = ? AND option = ?",
+                [(poll.message_id, user_id, index) for user_id, index in removed]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO poll_votes (message_id, user_id, option, voted_at) VALUES (?, ?, ?, ?)",
+                [(poll.message_id, user_id, index, now) for user_id, index in added]
+            )
+        if removed or added:
+            await self.storage.transaction(store)
+
+    async def mark_closed(self, message_id):
+        def close(conn):
+            conn.execute("UPDATE polls SET closed = 1 WHERE message_id = ?", (message_id,))
+            conn.execute("DELETE FROM poll_votes WHERE message_id = ?", (message_id,))
+        await self.storage.transaction(close)
+
+    async def close_poll(self, message_id):
+        poll = self.polls.pop(message_id, None)
+        if poll is None:
+            return
+        self.edits.cancel(message_id)
+        await self.bot.wait_until_ready()
+
+        try:
+            await self.publish_results(poll)
+            await self.mark_closed(message_id)
+        except Exception as e:
+            # Keep the poll open with its tally and try again later instead of losing it
+            self.polls[message_id] = poll
+            self.closer.schedule(message_id, lambda: self.close_poll(message_id), delay=POLL_CLOSE_RETRY)
+            if not isinstance(e, discord.HTTPException):
+                raise
+            log.warning("Could not close poll, retrying in %gs: %s", POLL_CLOSE_RETRY, e, extra=fields(message_id=message_id))
+            return
+        if poll.view:
+            # discord.py keeps a sent view (keyed by message) until it is stopped
+            poll.view.stop()
+
+    async def publish_results(self, poll):
+        channel = self.bot.get_channel(poll.channel_id)
+        try:
+            if channel is None:
+                channel = await self.bot.fetch_channel(poll.channel_id)
+            msg = channel.get_partial_message(poll.message_id)
+            if poll.resync:
+                msg = await channel.fetch_message(poll.message_id)
+                await self.resync_reactions(poll, msg)
+        except (discord.NotFound, discord.Forbidden):
+            # Poll message or channel is gone; nothing left to update
+            return
+
+        # The tally is already complete, so closing costs one edit
+        names = {}
+        if not poll.anonymous:
+            names = await self.users.display_names(self.bot.get_guild(poll.guild_id), list(poll.votes))
+        voters = {}
+        for user_id, index in poll.votes.items():
+            if names.get(user_id):
+                voters.setdefault(index, []).append(names[user_id])
+
+        result_embed = Embed(title="📊 Poll Closed", description=poll.question, color=discord.Color.light_gray())
+        for index, ((text, emoji), count) in enumerate(zip(poll.options, poll.counts)):
+            value = f"**{count} vote(s)**"
+            if not poll.anonymous:
+                value += "\n" + join_limited(voters.get(index, []), "No votes", FIELD_LIMIT - len(value) - 1, sep=", ")
+            result_embed.add_field(name=f"{emoji} {text}", value=value, inline=False)
+
+        result_embed.set_footer(text=f"Poll created by {poll.creator_name}")
+        try:
+            if poll.buttons:
+                await msg.edit(embed=result_embed, view=None)
+            else:
+                await msg.edit(embed=result_embed)
+        except (discord.NotFound, discord.Forbidden):
+            pass  # deleted, or we lost access to it; either way there is nothing to retry
 
     @app_commands.command(name="poll", description="Create a custom emoji poll with 2–6 options and a closing timer.")
     @app_commands.describe(
         question="Your poll question",
         duration_minutes="How many minutes until the poll closes?",
         anonymous="Hide voter usernames in the final results?",
+        buttons="Vote with buttons instead of reactions",
         option1_text="Option 1 text", option1_emoji="Option 1 emoji",
         option2_text="Option 2 text", option2_emoji="Option 2 emoji",
         option3_text="Option 3 text", option3_emoji="Option 3 emoji",
@@ -45,7 +363,8 @@ class Polls(commands.Cog):
         option3_text: str = None, option3_emoji: str = None,
         option4_text: str = None, option4_emoji: str = None,
         option5_text: str = None, option5_emoji: str = None,
-        option6_text: str = None, option6_emoji: str = None
+        option6_text: str = None, option6_emoji: str = None,
+        buttons: bool = False
     ):
         await interaction.response.defer()
 
@@ -55,6 +374,7 @@ class Polls(commands.Cog):
             question=question,
             duration=f"{duration_minutes} min",
             anonymous=anonymous,
+            buttons=buttons,
             options={f"{text}": emoji for text, emoji in [
                 (option1_text, option1_emoji),
                 (option2_text, option2_emoji),
@@ -82,14 +402,29 @@ class Polls(commands.Cog):
             await interaction.followup.send(embed=Embed(title="❌ Error", description="You need at least 2 options.", color=discord.Color.red()), ephemeral=True)
             return
 
-        # Send poll embed
-        embed = Embed(title="📊 Poll", description=question, color=discord.Color.blurple())
-        for text, emoji in options:
-            embed.add_field(name=f"{emoji} {text}", value=" ", inline=False)
-        embed.set_footer(text=f"Poll closes in {duration_minutes} minutes • Created by {interaction.user.display_name}")
-        embed.timestamp = datetime.now(pytz.timezone("US/Eastern"))
+        # Track the poll before adding reactions so early votes are already counted
+        poll = Poll(
+            0, interaction.guild.id, interaction.channel.id,
+            interaction.user.id, interaction.user.display_name,
+            question, options, anonymous, time.time() + duration_minutes * 60, buttons
+        )
+        if buttons:
+            # One message, no reactions to add
+            try:
+                poll.view = PollVoteView(self, options)
+                msg = await interaction.followup.send(embed=poll_embed(poll), view=poll.view, wait=True)
+            except discord.HTTPException:
+                # Discord rejects unknown emoji on buttons; fall back to text-only labels
+                poll.view = PollVoteView(self, options, emojis=False)
+                msg = await interaction.followup.send(embed=poll_embed(poll), view=poll.view, wait=True)
+        else:
+            msg = await interaction.followup.send(embed=poll_embed(poll), wait=True)
+        poll.message_id = msg.id
+        self.track(poll)
+        await self.storage.execute(f"INSERT INTO polls ({POLL_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", poll.to_row())
 
-        msg = await interaction.followup.send(embed=embed, wait=True)
+        if buttons:
+            return
 
         for _, emoji in options:
             try:
@@ -97,38 +432,6 @@ class Polls(commands.Cog):
             except:
                 pass  # Skip invalid emojis
 
-        # Wait for poll to finish
-        await asyncio.sleep(duration_minutes * 60)
-
-        # Fetch updated message
-        msg = await interaction.channel.fetch_message(msg.id)
-
-        # Tally votes
-        votes = {}
-        user_voted = set()
-
-        for reaction in msg.reactions:
-            if str(reaction.emoji) not in [e for _, e in options]:
-                continue
-            async for user in reaction.users():
-                if user.bot:
-                    continue
-                if user.id not in user_voted:
-                    votes.setdefault(str(reaction.emoji), []).append(user)
-                    user_voted.add(user.id)
-
-        # Build results
-        result_embed = Embed(title="📊 Poll Closed", description=question, color=discord.Color.gray())
-        for text, emoji in options:
-            voters = votes.get(emoji, [])
-            count = len(voters)
-            value = f"**{count} vote(s)**" if anonymous else f"**{count} vote(s)**\n" + ", ".join(u.display_name for u in voters) or "No votes"
-            result_embed.add_field(name=f"{emoji} {text}", value=value, inline=False)
-
-        result_embed.set_footer(text=f"Poll created by {interaction.user.display_name}")
-        await msg.edit(embed=result_embed)
-
 # --- Cog setup ---
 async def setup(bot):
     await bot.add_cog(Polls(bot))
-
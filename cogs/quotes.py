@@ -1,40 +1,11 @@
 import discord
 from discord.ext import commands
 from discord import app_commands, Interaction, Embed, ui
-import os
-import json
-
-QUOTE_FILE = "quotes.json"
-
-# Color codes for debug output
-GREEN = "\033[1;32m"
-YELLOW = "\033[1;33m"
-CYAN = "\033[1;36m"
-RED = "\033[1;31m"
-RESET = "\033[0m"
-
-def load_quote_data():
-    if os.path.exists(QUOTE_FILE):
-        try:
-            with open(QUOTE_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def save_quote_data(data):
-    with open(QUOTE_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
-def debug_command(name, user, **kwargs):
-    print(f"{GREEN}[COMMAND] /{name}{RESET} triggered by {YELLOW}{user.display_name}{RESET}")
-    if kwargs:
-        print(f"{CYAN}Input:{RESET}")
-        for key, val in kwargs.items():
-            print(f"{RED}  {key.capitalize()}: {val}{RESET}")
+from utils.debug import debug_command
 
 class QuotePagination(ui.View):
     def __init__(self, quotes, per_page=5):
+        # quotes is a list of (quote_id, text) rows
         super().__init__(timeout=60)
         self.quotes = quotes
         self.per_page = per_page
@@ -46,7 +17,7 @@ class QuotePagination(ui.View):
         end = start + self.per_page
         embed = discord.Embed(
             title=f"📜 Saved Quotes (Page {self.page + 1}/{self.max_pages})",
-            description="\n".join([f"**{i+1}.** {q}" for i, q in enumerate(self.quotes[start:end], start=start)]),
+            description="\n".join([f"**{i+1}.** {text}" for i, (_, text) in enumerate(self.quotes[start:end], start=start)]),
             color=discord.Color.blurple()
         )
         return embed
@@ -70,40 +41,45 @@ class QuotePagination(ui.View):
 class Quotes(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.quotes = load_quote_data()
+        self.storage = bot.storage
+        self.quotes = {}  # guild_id -> [(quote_id, text), ...] in insertion order
+
+    async def cog_load(self):
+        for quote_id, guild_id, text in await self.storage.fetchall("SELECT id, guild_id, text FROM quotes ORDER BY id"):
+            self.quotes.setdefault(guild_id, []).append((quote_id, text))
 
     def ensure_guild_entry(self, guild_id):
-        if str(guild_id) not in self.quotes:
-            self.quotes[str(guild_id)] = []
+        if guild_id not in self.quotes:
+            self.quotes[guild_id] = []
 
     @app_commands.command(name="quote_add", description="Add a new quote.")
     @app_commands.describe(text="The quote and who said it.")
     async def quote_add(self, interaction: Interaction, text: str):
         debug_command("quote_add", interaction.user, text=text)
-        guild_id = str(interaction.guild.id)
+        guild_id = interaction.guild.id
         self.ensure_guild_entry(guild_id)
-        self.quotes[guild_id].append(text)
-        save_quote_data(self.quotes)
+        quote_id = await self.storage.execute("INSERT INTO quotes (guild_id, text) VALUES (?, ?)", (guild_id, text))
+        self.quotes[guild_id].append((quote_id, text))
         embed = Embed(title="✅ Quote Saved", description="Your quote was added!", color=discord.Color.green())
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="quote_get", description="Get a random quote.")
     async def quote_get(self, interaction: Interaction):
         debug_command("quote_get", interaction.user)
-        guild_id = str(interaction.guild.id)
+        guild_id = interaction.guild.id
         if guild_id not in self.quotes or not self.quotes[guild_id]:
             embed = Embed(title="❌ No Quotes", description="There are no quotes saved for this server.", color=discord.Color.red())
             await interaction.response.send_message(embed=embed)
             return
         import random
-        quote = random.choice(self.quotes[guild_id])
+        _, quote = random.choice(self.quotes[guild_id])
         embed = Embed(title="📜 Random Quote", description=f"\"{quote}\"", color=discord.Color.blurple())
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="quote_list", description="Lists all saved quotes with pagination.")
     async def quote_list(self, interaction: Interaction):
         debug_command("quote_list", interaction.user)
-        guild_id = str(interaction.guild.id)
+        guild_id = interaction.guild.id
 
         if guild_id not in self.quotes or not self.quotes[guild_id]:
             embed = Embed(title="❌ No Quotes", description="There are no quotes saved for this server.", color=discord.Color.red())
@@ -117,15 +93,17 @@ class Quotes(commands.Cog):
     @app_commands.describe(index="The quote number to edit", new_text="The new quote text")
     async def quote_edit(self, interaction: Interaction, index: int, new_text: str):
         debug_command("quote_edit", interaction.user, index=index, new_text=new_text)
-        guild_id = str(interaction.guild.id)
+        guild_id = interaction.guild.id
 
         if guild_id not in self.quotes or index < 1 or index > len(self.quotes[guild_id]):
             embed = Embed(title="❌ Invalid Quote", description="Quote number is invalid.", color=discord.Color.red())
             await interaction.response.send_message(embed=embed)
             return
 
-        self.quotes[guild_id][index - 1] = new_text
-        save_quote_data(self.quotes)
+        # Update the list before awaiting the write so a concurrent edit/delete sees the same positions
+        quote_id, _ = self.quotes[guild_id][index - 1]
+        self.quotes[guild_id][index - 1] = (quote_id, new_text)
+        await self.storage.execute("UPDATE quotes SET text = ? WHERE id = ?", (new_text, quote_id))
         embed = Embed(title="✏️ Quote Updated", description=f"Quote #{index} has been updated.", color=discord.Color.green())
         await interaction.response.send_message(embed=embed)
 
@@ -133,15 +111,16 @@ class Quotes(commands.Cog):
     @app_commands.describe(index="The quote number to delete")
     async def quote_delete(self, interaction: Interaction, index: int):
         debug_command("quote_delete", interaction.user, index=index)
-        guild_id = str(interaction.guild.id)
+        guild_id = interaction.guild.id
 
         if guild_id not in self.quotes or index < 1 or index > len(self.quotes[guild_id]):
             embed = Embed(title="❌ Invalid Quote", description="Quote number is invalid.", color=discord.Color.red())
             await interaction.response.send_message(embed=embed)
             return
 
-        removed = self.quotes[guild_id].pop(index - 1)
-        save_quote_data(self.quotes)
+        # Pop before awaiting the write so a second /quote_delete can't remove the same quote twice
+        quote_id, removed = self.quotes[guild_id].pop(index - 1)
+        await self.storage.execute("DELETE FROM quotes WHERE id = ?", (quote_id,))
         embed = Embed(
             title="🗑️ Quote Deleted",
             description=f"Removed quote #{index}:\n\n\"{removed}\"",
@@ -1,36 +1,26 @@
 import discord
 from discord.ext import commands
 from discord import app_commands, Interaction
-import json
-import os
+from utils.log import fields, get_logger
+from utils.metrics import timed_listener
 
-# --- Console Colors ---
-RESET = "\033[0m"
-BOLD = "\033[1m"
-CYAN = "\033[96m"
-YELLOW = "\033[93m"
-BLUE = "\033[94m"
-
-WELCOME_CONFIG = "welcome_config.json"
-
-def load_welcome_config():
-    if os.path.exists(WELCOME_CONFIG):
-        with open(WELCOME_CONFIG, "r") as f:
-            return json.load(f)
-    return {}
-
-def save_welcome_config(config):
-    with open(WELCOME_CONFIG, "w") as f:
-        json.dump(config, f, indent=4)
+log = get_logger("welcome")
 
 class Welcome(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.welcome_config = load_welcome_config()
+        self.storage = bot.storage
+        self.welcome_config = {}  # guild_id -> {"channel_id", "message", "role_id"}
+
+    async def cog_load(self):
+        rows = await self.storage.fetchall("SELECT guild_id, channel_id, message, role_id FROM welcome_config")
+        for guild_id, channel_id, message, role_id in rows:
+            self.welcome_config[guild_id] = {"channel_id": channel_id, "message": message, "role_id": role_id}
 
     @commands.Cog.listener()
+    @timed_listener("welcome.on_member_join")
     async def on_member_join(self, member):
-        guild_id = str(member.guild.id)
+        guild_id = member.guild.id
 
         config = self.welcome_config.get(guild_id)
         if not config:
@@ -42,7 +32,7 @@ class Welcome(commands.Cog):
 
         # Give role if defined
         if role_id:
-            role = member.guild.get_role(int(role_id))
+            role = member.guild.get_role(role_id)
             if role:
                 await member.add_roles(role)
 
@@ -50,7 +40,7 @@ class Welcome(commands.Cog):
         formatted_message = welcome_message.format(user=member.name, server=member.guild.name)
 
         # Send the welcome embed
-        channel = member.guild.get_channel(int(channel_id))
+        channel = member.guild.get_channel(channel_id)
         if channel:
             embed = discord.Embed(
                 title="🎉 Welcome!",
@@ -63,21 +53,28 @@ class Welcome(commands.Cog):
 
             await channel.send(embed=embed)
 
-            # DEBUG LOG
-            print(f"{BOLD}{CYAN}[WELCOME]{RESET} Welcomed {YELLOW}{member.name}{RESET} to {BLUE}{member.guild.name}{RESET}")
+            log.info(
+                "Welcomed %s to %s", member.name, member.guild.name,
+                extra=fields(guild_id=member.guild.id, user_id=member.id)
+            )
 
     @app_commands.command(name="setwelcome", description="Configure the welcome message settings.")
     @app_commands.describe(channel="The channel to send welcome messages to.", message="The welcome message. Use {user} and {server}.", role="Optional role to assign to new members.")
     async def set_welcome(self, interaction: Interaction, channel: discord.TextChannel, message: str, role: discord.Role = None):
-        guild_id = str(interaction.guild.id)
+        guild_id = interaction.guild.id
+        role_id = role.id if role else None
 
         self.welcome_config[guild_id] = {
-            "channel_id": str(channel.id),
+            "channel_id": channel.id,
             "message": message,
-            "role_id": str(role.id) if role else None
+            "role_id": role_id
         }
 
-        save_welcome_config(self.welcome_config)
+        await self.storage.execute(
+            "INSERT INTO welcome_config (guild_id, channel_id, message, role_id) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(guild_id) DO UPDATE SET channel_id = excluded.channel_id, message = excluded.message, role_id = excluded.role_id",
+            (guild_id, channel.id, message, role_id)
+        )
 
         embed = discord.Embed(
             title="✅ Welcome Configuration Set",
@@ -88,8 +85,7 @@ class Welcome(commands.Cog):
 
     @app_commands.command(name="welcomeconfig", description="Show current welcome message configuration.")
     async def welcome_config_show(self, interaction: Interaction):
-        guild_id = str(interaction.guild.id)
-        config = self.welcome_config.get(guild_id)
+        config = self.welcome_config.get(interaction.guild.id)
 
         if not config:
             embed = discord.Embed(
@@ -100,8 +96,8 @@ class Welcome(commands.Cog):
             await interaction.response.send_message(embed=embed)
             return
 
-        channel = self.bot.get_channel(int(config['channel_id']))
-        role = interaction.guild.get_role(int(config['role_id'])) if config.get('role_id') else None
+        channel = self.bot.get_channel(config['channel_id'])
+        role = interaction.guild.get_role(config['role_id']) if config.get('role_id') else None
         message = config.get("message", "")
 
         embed = discord.Embed(
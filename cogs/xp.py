@@ -1,123 +1,378 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
+import asyncio
+import logging
 import os
 import random
+import time
+from bisect import bisect_left, insort
+from utils.users import UserResolver
+from utils.debug import debug_command
+from utils.log import fields, get_logger
+from utils.metrics import metrics, timed_listener
 
-# --- Console Colors ---
-RESET = "\033[0m"
-BOLD = "\033[1m"
-RED = "\033[91m"
-GREEN = "\033[92m"
-YELLOW = "\033[93m"
-BLUE = "\033[94m"
-CYAN = "\033[96m"
+log = get_logger("xp")
+award_log = get_logger("xp.awards", sample=0.01)  # one line per award is a lot; keep 1% by default
 
 # --- XP Settings ---
-XP_FILE = "xp_data.json"
 XP_PER_MESSAGE = 10
 BASE_XP = 100
 
+# --- Persistence Settings ---
+# XP changes are buffered in memory and written out by a background task,
+# either every XP_FLUSH_INTERVAL seconds or once XP_FLUSH_THRESHOLD users are dirty.
+XP_FLUSH_INTERVAL = float(os.getenv("XP_FLUSH_INTERVAL", "30"))
+XP_FLUSH_THRESHOLD = int(os.getenv("XP_FLUSH_THRESHOLD", "200"))
+
+# --- Ingestion Settings ---
+# Messages are queued and applied in batches every XP_BATCH_WINDOW seconds.
+# A user earns XP at most once per XP_COOLDOWN seconds (0 = every message counts).
+XP_BATCH_WINDOW = float(os.getenv("XP_BATCH_WINDOW", "1.0"))
+XP_COOLDOWN = float(os.getenv("XP_COOLDOWN", "0"))
+XP_QUEUE_SIZE = int(os.getenv("XP_QUEUE_SIZE", "10000"))
+XP_MAX_ANNOUNCEMENTS = int(os.getenv("XP_MAX_ANNOUNCEMENTS", "5"))  # names per level-up embed
+
+UPSERT_XP_SQL = (
+    "INSERT INTO xp_users (guild_id, user_id, xp, level) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(guild_id, user_id) DO UPDATE SET xp = excluded.xp, level = excluded.level"
+)
+
 level_up_responses = [
     "Fuck you {user}, you're now level {level}!",
     "Keep yourself safe {user}, you leveled up to {level}!",
     "Die {user}! Level {level} reached!"
 ]
 
-# --- JSON Load/Save Helpers ---
-def load_xp_data():
-    if os.path.exists(XP_FILE):
-        try:
-            with open(XP_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def save_xp_data(xp_data):
-    with open(XP_FILE, "w") as f:
-        json.dump(xp_data, f, indent=4)
-
 def get_xp_needed(level):
     return BASE_XP * (level + 1)
 
+# --- Guild Config ---
+class GuildXPConfig:
+    # Compiled, read-only view of a guild's XP settings for the on_message hot path.
+    # Commands that change settings build a new instance instead of mutating this one.
+    __slots__ = ("xp_per_message", "blocked_channels", "custom_rate")
+
+    def __init__(self, xp_per_message=None, blocked_channels=()):
+        self.custom_rate = xp_per_message is not None
+        self.xp_per_message = xp_per_message if xp_per_message is not None else XP_PER_MESSAGE
+        self.blocked_channels = frozenset(blocked_channels)
+
+    def with_rate(self, xp_per_message):
+        return GuildXPConfig(xp_per_message, self.blocked_channels)
+
+    def with_blocked(self, blocked_channels):
+        return GuildXPConfig(self.xp_per_message if self.custom_rate else None, blocked_channels)
+
+DEFAULT_CONFIG = GuildXPConfig()
+
+# --- Rank Index ---
+class RankIndex:
+    # Keeps one guild's users ordered by (level, xp) descending, so /level and
+    # /leaderboard do a binary search or a slice instead of sorting the guild.
+    # Keys are (-level, -xp, user_id) so ties have a stable order.
+
+    def __init__(self, users=None):
+        self.keys = {}      # user_id -> sort key
+        self.ordered = []   # sort keys, ascending
+        if users:
+            for user_id, data in users.items():
+                self.keys[user_id] = (-data["level"], -data["xp"], user_id)
+            self.ordered = sorted(self.keys.values())
+
+    def __len__(self):
+        return len(self.ordered)
+
+    def update(self, user_id, data):
+        key = (-data["level"], -data["xp"], user_id)
+        old = self.keys.get(user_id)
+        if old == key:
+            return
+        if old is not None:
+            del self.ordered[bisect_left(self.ordered, old)]
+        insort(self.ordered, key)
+        self.keys[user_id] = key
+
+    def rank(self, user_id):
+        # Users with no entry yet are ranked where a level 0 / 0 XP entry would sit
+        key = self.keys.get(user_id, (0, 0, user_id))
+        return bisect_left(self.ordered, key) + 1
+
+    def top(self, n):
+        return [key[2] for key in self.ordered[:n]]
+
 # --- XP Cog ---
 class XPSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.xp_data = load_xp_data()
+        self.storage = bot.storage
+        self.xp_data = {}   # guild_id -> user_id -> {"xp", "level"}
+        self.configs = {}   # guild_id -> GuildXPConfig
+        self.ranks = {}     # guild_id -> RankIndex
+        self.users = UserResolver(bot)
+
+        # Write-behind state
+        self.dirty_users = set()  # (guild_id, user_id)
+        self.closing = False
+        self.flush_lock = asyncio.Lock()
+        self.flush_wakeup = asyncio.Event()
+        self.flush_task = None
+
+        # Ingestion pipeline state
+        self.xp_queue = asyncio.Queue(maxsize=XP_QUEUE_SIZE)
+        self.last_award = {}  # (guild_id, user_id) -> monotonic time of last counted message
+        self.last_prune = time.monotonic()
+        self.ingest_task = None
+        self.stats = {
+            "events": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "dropped_cooldown": 0,
+            "dropped_full": 0,
+            "announcements": 0
+        }
+
+    async def cog_load(self):
+        for guild_id, user_id, xp, level in await self.storage.fetchall("SELECT guild_id, user_id, xp, level FROM xp_users"):
+            self.xp_data.setdefault(guild_id, {})[user_id] = {"xp": xp, "level": level}
+        for guild_id, users in self.xp_data.items():
+            self.ranks[guild_id] = RankIndex(users)
+
+        rates = dict(await self.storage.fetchall("SELECT guild_id, xp_per_message FROM xp_config"))
+        blocked = {}
+        for guild_id, channel_id in await self.storage.fetchall("SELECT guild_id, channel_id FROM xp_blocked_channels"):
+            blocked.setdefault(guild_id, []).append(channel_id)
+        for guild_id in rates.keys() | blocked.keys():
+            self.configs[guild_id] = GuildXPConfig(rates.get(guild_id), blocked.get(guild_id, ()))
+
+        self.flush_task = asyncio.create_task(self.flush_loop())
+        self.ingest_task = asyncio.create_task(self.ingest_loop())
+
+        metrics.register_gauges("xp_pipeline", self.pipeline_stats)
+        metrics.register_gauges("xp_user_cache", self.users.stats)
+
+    async def cog_unload(self):
+        metrics.unregister_gauges("xp_pipeline")
+        metrics.unregister_gauges("xp_user_cache")
+        # Apply whatever is still queued (without announcing), then stop the background writer
+        if self.ingest_task:
+            self.ingest_task.cancel()
+            try:
+                await self.ingest_task
+            except asyncio.CancelledError:
+                pass
+        events = []
+        while not self.xp_queue.empty():
+            events.append(self.xp_queue.get_nowait())
+        self.apply_batch(events)
+
+        self.closing = True
+        self.flush_wakeup.set()
+        if self.flush_task:
+            await self.flush_task
+        await self.flush()
+
+    def pipeline_stats(self):
+        return dict(self.stats, queue_depth=self.xp_queue.qsize())
+
+    def get_config(self, guild_id):
+        return self.configs.get(guild_id, DEFAULT_CONFIG)
+
+    def mark_dirty(self, guild_id, user_id):
+        self.dirty_users.add((guild_id, user_id))
+        if len(self.dirty_users) >= XP_FLUSH_THRESHOLD:
+            self.flush_wakeup.set()
+
+    async def flush(self):
+        async with self.flush_lock:
+            if not self.dirty_users:
+                return
+
+            dirty = self.dirty_users
+            self.dirty_users = set()
+
+            # Snapshot only the changed rows on the loop; the upsert runs on the storage thread
+            rows = []
+            for guild_id, user_id in dirty:
+                data = self.xp_data[guild_id][user_id]
+                rows.append((guild_id, user_id, data["xp"], data["level"]))
 
-    def ensure_user_entry(self, guild_id, user_id):
-        guild_id = str(guild_id)
-        user_id = str(user_id)
+            try:
+                await self.storage.executemany(UPSERT_XP_SQL, rows)
+            except Exception:
+                self.dirty_users |= dirty
+                raise
+
+            log.info(
+                "Saved XP data (%d user(s) changed)", len(rows),
+                extra=fields(
+                    queue_depth=self.xp_queue.qsize(),
+                    last_batch=self.stats['last_batch_size'],
+                    max_batch=self.stats['max_batch_size']
+                )
+            )
+
+    async def flush_loop(self):
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.flush_wakeup.wait(), timeout=XP_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_wakeup.clear()
 
+            try:
+                await self.flush()
+            except Exception as e:
+                log.exception("Failed to save XP data: %s", e)
+
+    def ensure_user_entry(self, guild_id, user_id):
         if guild_id not in self.xp_data:
             self.xp_data[guild_id] = {}
+            self.ranks[guild_id] = RankIndex()
 
         if user_id not in self.xp_data[guild_id]:
             self.xp_data[guild_id][user_id] = {"xp": 0, "level": 0}
 
     @commands.Cog.listener()
+    @timed_listener("xp.on_message")
     async def on_message(self, message):
         if message.author.bot or not message.guild:
             return
 
-        guild_id = str(message.guild.id)
-        user_id = str(message.author.id)
+        guild_id = message.guild.id
+        config = self.configs.get(guild_id, DEFAULT_CONFIG)
+        if message.channel.id in config.blocked_channels:
+            return  # Skip XP in blocked channels
 
-        self.ensure_user_entry(guild_id, user_id)
+        key = (guild_id, message.author.id)
+        if XP_COOLDOWN:
+            now = time.monotonic()
+            last = self.last_award.get(key)
+            if last is not None and now - last < XP_COOLDOWN:
+                self.stats["dropped_cooldown"] += 1
+                return
+            self.last_award[key] = now
 
-        user_data = self.xp_data[guild_id][user_id]
-        xp_amount = self.xp_data.get(guild_id, {}).get("config", {}).get("xp_per_message", XP_PER_MESSAGE)
-        blocked = self.xp_data.get(guild_id, {}).get("config", {}).get("blocked_channels", [])
-        if str(message.channel.id) in blocked:
-            return  # Skip XP in blocked channels
+        try:
+            self.xp_queue.put_nowait((key, message.channel, message.author))
+        except asyncio.QueueFull:
+            self.stats["dropped_full"] += 1
 
-        user_data["xp"] += xp_amount
+    async def ingest_loop(self):
+        while True:
+            first = await self.xp_queue.get()
 
+            # Let the rest of a burst arrive, then take everything queued in one go
+            try:
+                await asyncio.sleep(XP_BATCH_WINDOW)
+            except asyncio.CancelledError:
+                self.apply_batch([first])
+                raise
+            events = [first]
+            while not self.xp_queue.empty():
+                events.append(self.xp_queue.get_nowait())
 
-        if user_data["xp"] >= get_xp_needed(user_data["level"]):
-            user_data["xp"] = 0
-            user_data["level"] += 1
+            try:
+                level_ups = self.apply_batch(events)
+                await self.announce(level_ups)
+            except Exception as e:
+                log.exception("Failed to apply XP batch: %s", e)
 
-            embed = discord.Embed(
-                title="🎮 Level Up!",
-                description=random.choice(level_up_responses).format(user=message.author.mention, level=user_data["level"]),
-                color=discord.Color.gold()
-            )
-            await message.channel.send(embed=embed)
+            self.prune_cooldowns()
 
-            print(f"{BOLD}{GREEN}[LEVEL UP]{RESET} {message.author.display_name} is now level {user_data['level']}")
+    def apply_batch(self, events):
+        """Apply queued messages; returns {channel: {member: new level}} for announcements."""
+        if not events:
+            return {}
 
-        save_xp_data(self.xp_data)
+        self.stats["events"] += len(events)
+        self.stats["batches"] += 1
+        self.stats["last_batch_size"] = len(events)
+        self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(events))
+
+        # Collapse the batch to one entry per (guild, user)
+        pending = {}
+        for key, channel, author in events:
+            entry = pending.get(key)
+            if entry:
+                entry[0] += 1
+                entry[1] = channel
+            else:
+                pending[key] = [1, channel, author]
+
+        level_ups = {}
+        for (guild_id, user_id), (count, channel, author) in pending.items():
+            rate = self.get_config(guild_id).xp_per_message
+            self.ensure_user_entry(guild_id, user_id)
+            user_data = self.xp_data[guild_id][user_id]
+
+            # Award message by message so level thresholds behave exactly as before
+            leveled = False
+            for _ in range(count):
+                user_data["xp"] += rate
+                if user_data["xp"] >= get_xp_needed(user_data["level"]):
+                    user_data["xp"] = 0
+                    user_data["level"] += 1
+                    leveled = True
+
+            if leveled:
+                level_ups.setdefault(channel, {})[author] = user_data["level"]
+                log.info(
+                    "%s is now level %d", author.display_name, user_data["level"],
+                    extra=fields(guild_id=guild_id, user_id=user_id)
+                )
+            if award_log.isEnabledFor(logging.INFO):
+                award_log.info(
+                    "Awarded %d XP", count * rate,
+                    extra=fields(guild_id=guild_id, user_id=user_id, messages=count, xp=user_data["xp"], level=user_data["level"])
+                )
+
+            self.ranks[guild_id].update(user_id, user_data)
+            self.mark_dirty(guild_id, user_id)
+
+        return level_ups
+
+    async def announce(self, level_ups):
+        # One message per channel per batch, however many people leveled up in it
+        sends = []
+        for channel, leveled in level_ups.items():
+            if len(leveled) == 1:
+                (author, level), = leveled.items()
+                description = random.choice(level_up_responses).format(user=author.mention, level=level)
+            else:
+                shown = list(leveled.items())[:XP_MAX_ANNOUNCEMENTS]
+                lines = [f"{author.mention} reached level **{level}**" for author, level in shown]
+                if len(leveled) > len(shown):
+                    lines.append(f"...and {len(leveled) - len(shown)} more!")
+                description = "\n".join(lines)
+
+            embed = discord.Embed(title="🎮 Level Up!", description=description, color=discord.Color.gold())
+            sends.append(channel.send(embed=embed))
+
+        if sends:
+            self.stats["announcements"] += len(sends)
+            await asyncio.gather(*sends, return_exceptions=True)
+
+    def prune_cooldowns(self):
+        # Forget users whose cooldown has long expired so the map doesn't grow forever
+        now = time.monotonic()
+        if not XP_COOLDOWN or now - self.last_prune < 60:
+            return
+        self.last_prune = now
+        self.last_award = {key: t for key, t in self.last_award.items() if now - t < XP_COOLDOWN}
 
     @app_commands.command(name="level", description="Check your current level and XP.")
     async def level(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild.id)
-        user_id = str(interaction.user.id)
+        guild_id = interaction.guild.id
+        user_id = interaction.user.id
 
-    # Ensure the command user has an entry
-        self.ensure_user_entry(guild_id, user_id)
+        # Members without an entry haven't earned XP yet; show them as level 0 without storing anything
+        user_data = self.xp_data.get(guild_id, {}).get(user_id, {"xp": 0, "level": 0})
+        ranks = self.ranks.get(guild_id)
+        rank = ranks.rank(user_id) if ranks else 1
 
-    # Ensure all members in the guild have entries to avoid KeyErrors
-        for member in interaction.guild.members:
-            if not member.bot:
-                self.ensure_user_entry(guild_id, str(member.id))
-
-        user_data = self.xp_data[guild_id][user_id]
-
-        # Sort all users in the guild
-        all_users = sorted(
-            self.xp_data[guild_id].items(),
-            key=lambda x: (x[1].get("level", 0), x[1].get("xp", 0)),
-            reverse=True
-        )
-
-    # Determine the rank
-        rank = next((i for i, (uid, _) in enumerate(all_users, 1) if uid == user_id), "Unknown")
-
-        print(f"{BOLD}{CYAN}[COMMAND]{RESET} /level used by {YELLOW}{interaction.user.display_name}{RESET}")
+        debug_command("level", interaction.user)
 
         embed = discord.Embed(
             title="🏆 XP Level",
@@ -139,9 +394,9 @@ class XPSystem(commands.Cog):
 
     @app_commands.command(name="leaderboard", description="See the top 10 users by level and XP.")
     async def leaderboard(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild.id)
+        guild_id = interaction.guild.id
 
-        print(f"{BOLD}{CYAN}[COMMAND]{RESET} /leaderboard used by {YELLOW}{interaction.user.display_name}{RESET}")
+        debug_command("leaderboard", interaction.user)
 
     # If there's no data yet
         if guild_id not in self.xp_data or not self.xp_data[guild_id]:
@@ -153,34 +408,15 @@ class XPSystem(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-    # Ensure all users have valid XP/level data
-        for user_id, data in self.xp_data[guild_id].items():
-            if not isinstance(data, dict):
-                self.xp_data[guild_id][user_id] = {"xp": 0, "level": 0}
-            else:
-                data.setdefault("xp", 0)
-                data.setdefault("level", 0)
-
-    # Sort safely using fallback values
-        def safe_sort_key(item):
-            data = item[1]
-            return (data.get("level", 0), data.get("xp", 0))
-
-        sorted_users = sorted(
-            self.xp_data[guild_id].items(),
-            key=safe_sort_key,
-            reverse=True
-        )
+        top_users = self.ranks[guild_id].top(10)
+        names = await self.users.display_names(interaction.guild, top_users)
 
     # Create embed
         embed = discord.Embed(title="🏆 Leaderboard", color=discord.Color.blue())
 
-        for i, (user_id, data) in enumerate(sorted_users[:10], start=1):
-            try:
-                user = await self.bot.fetch_user(int(user_id))
-                name = user.display_name
-            except:
-                name = f"<Unknown User {user_id}>"
+        for i, user_id in enumerate(top_users, start=1):
+            data = self.xp_data[guild_id][user_id]
+            name = names.get(user_id) or f"<Unknown User {user_id}>"
 
             embed.add_field(
                 name=f"{i}. {name}",
@@ -194,18 +430,19 @@ class XPSystem(commands.Cog):
     @app_commands.command(name="xpset", description="Set the amount of XP given per message in this server.")
     @app_commands.describe(amount="XP amount per message (positive integer)")
     async def xpset(self, interaction: discord.Interaction, amount: int):
-        guild_id = str(interaction.guild.id)
+        guild_id = interaction.guild.id
 
         if amount <= 0:
             embed = discord.Embed(title="❌ Invalid Value", description="XP amount must be greater than 0.", color=discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
-        if "config" not in self.xp_data.get(guild_id, {}):
-            self.xp_data.setdefault(guild_id, {})["config"] = {}
-
-        self.xp_data[guild_id]["config"]["xp_per_message"] = amount
-        save_xp_data(self.xp_data)
+        self.configs[guild_id] = self.get_config(guild_id).with_rate(amount)
+        await self.storage.execute(
+            "INSERT INTO xp_config (guild_id, xp_per_message) VALUES (?, ?) "
+            "ON CONFLICT(guild_id) DO UPDATE SET xp_per_message = excluded.xp_per_message",
+            (guild_id, amount)
+        )
 
         embed = discord.Embed(
             title="🛠️ XP Updated",
@@ -217,14 +454,15 @@ class XPSystem(commands.Cog):
     @app_commands.command(name="xpblock", description="Block a channel from giving XP.")
     @app_commands.describe(channel="The channel to block XP in")
     async def xpblock(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        guild_id = str(interaction.guild.id)
-
-        config = self.xp_data.setdefault(guild_id, {}).setdefault("config", {})
-        blocked = config.setdefault("blocked_channels", [])
-
-        if str(channel.id) not in blocked:
-            blocked.append(str(channel.id))
-            save_xp_data(self.xp_data)
+        guild_id = interaction.guild.id
+        config = self.get_config(guild_id)
+
+        if channel.id not in config.blocked_channels:
+            self.configs[guild_id] = config.with_blocked(config.blocked_channels | {channel.id})
+            await self.storage.execute(
+                "INSERT OR IGNORE INTO xp_blocked_channels (guild_id, channel_id) VALUES (?, ?)",
+                (guild_id, channel.id)
+            )
 
             embed = discord.Embed(
                 title="🔕 XP Blocked",
@@ -243,14 +481,15 @@ class XPSystem(commands.Cog):
     @app_commands.command(name="xpunblock", description="Unblock a channel from giving XP.")
     @app_commands.describe(channel="The channel to unblock XP in")
     async def xpunblock(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        guild_id = str(interaction.guild.id)
-
-        config = self.xp_data.setdefault(guild_id, {}).setdefault("config", {})
-        blocked = config.setdefault("blocked_channels", [])
-
-        if str(channel.id) in blocked:
-            blocked.remove(str(channel.id))
-            save_xp_data(self.xp_data)
+        guild_id = interaction.guild.id
+        config = self.get_config(guild_id)
+
+        if channel.id in config.blocked_channels:
+            self.configs[guild_id] = config.with_blocked(config.blocked_channels - {channel.id})
+            await self.storage.execute(
+                "DELETE FROM xp_blocked_channels WHERE guild_id = ? AND channel_id = ?",
+                (guild_id, channel.id)
+            )
 
             embed = discord.Embed(
                 title="✅ XP Unblocked",
@@ -268,21 +507,18 @@ class XPSystem(commands.Cog):
 
     @app_commands.command(name="xpconfig", description="Shows current XP system settings for this server.")
     async def xpconfig(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild.id)
-        config = self.xp_data.get(guild_id, {}).get("config", {})
-        xp_amount = config.get("xp_per_message", XP_PER_MESSAGE)
-        blocked_channels = config.get("blocked_channels", [])
+        config = self.get_config(interaction.guild.id)
 
         embed = discord.Embed(title="⚙️ XP System Config", color=discord.Color.blurple())
-        embed.add_field(name="XP per Message", value=f"**{xp_amount}**", inline=False)
-        if blocked_channels:
-            mentions = ", ".join(f"<#{cid}>" for cid in blocked_channels)
+        embed.add_field(name="XP per Message", value=f"**{config.xp_per_message}**", inline=False)
+        if config.blocked_channels:
+            mentions = ", ".join(f"<#{cid}>" for cid in sorted(config.blocked_channels))
             embed.add_field(name="Blocked Channels", value=mentions, inline=False)
         else:
             embed.add_field(name="Blocked Channels", value="None", inline=False)
 
         await interaction.response.send_message(embed=embed)
-                                                
+
 
 # --- Cog setup ---
 async def setup(bot):
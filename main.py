@@ -3,11 +3,20 @@ import os
 from discord.ext import commands
 from dotenv import load_dotenv
 from datetime import datetime
+from utils.storage import Storage
+from utils.cogs import load_cogs, selected_cogs
+from utils.sync import sync_commands
+from utils.migrate import migrate_json_files
+from utils.snipes import SnipeStore, SnipedMessage
+from utils.log import fields, get_logger, setup_logging
+from utils.metrics import InstrumentedTree, metrics, record_command, timed_listener
 
 # Load environment variables
 load_dotenv()
 TOKEN = os.getenv("TOKEN")
 
+log = get_logger("bot")
+
 
 # Intents
 intents = discord.Intents.default()
@@ -20,42 +29,61 @@ intents.voice_states = True
 # Bot Setup
 class JengBot(commands.Bot):
     def __init__(self):
-        super().__init__(command_prefix="!", intents=intents)
-        
-        
-        self.sniped_messages = {}
+        super().__init__(command_prefix="!", intents=intents, tree_cls=InstrumentedTree)
+
+        self.storage = Storage()
+        self.snipes = SnipeStore()
 
     async def setup_hook(self):
-        # Load all cogs from the cogs/ directory
-        for filename in os.listdir("./cogs"):
-            if filename.endswith(".py"):
-                await self.load_extension(f"cogs.{filename[:-3]}")
+        # Open the database (and import the old JSON files on first run) before any cog needs it
+        await self.storage.open()
+        counts = await migrate_json_files(self.storage)
+        if counts:
+            log.info("Migrated JSON data to SQLite: %d XP rows, %d quotes, %d welcome configs", *counts)
+
+        await metrics.start()
+
+        # Load the cogs from the cogs/ directory, limited by COGS / DISABLED_COGS
+        self.cog_timings = await load_cogs(self, selected_cogs())
+
+        # Once per process rather than on every (re)connect, and only if the commands changed
+        await sync_commands(self, self.storage)
 
-    
     async def on_ready(self):
         await self.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name="/help"))
-        print(f"Logged in as {self.user}")
-        print("Connected to:")
-        print(f"Cogs Loaded: {list(bot.cogs.keys())}")
-        for guild in self.guilds:
-            print(f" - {guild.name} ({guild.id})")
-        await self.tree.sync()
-        print("Slash commands synced globally")
+        log.info(
+            "Logged in as %s", self.user,
+            extra=fields(cogs=list(self.cogs.keys()), guilds=[f"{guild.name} ({guild.id})" for guild in self.guilds])
+        )
 
-bot = JengBot()
+    async def on_app_command_completion(self, interaction, command):
+        record_command(interaction, "ok")
 
-@bot.event
-async def on_message_delete(message):
-    if message.author.bot:
-        return
+    def snipe(self, message):
+        if message is not None and not message.author.bot:
+            self.snipes.add(message.channel.id, SnipedMessage.from_message(message))
 
-    bot.sniped_messages[message.channel.id] = {
-        "content": message.content,
-        "author": message.author,
-        "time": message.created_at
-    }
+    # Raw events fire even for messages that aren't in the message cache. Only cached
+    # messages still have their content, so those are the ones that can be sniped.
+    @timed_listener("snipe.on_raw_message_delete")
+    async def on_raw_message_delete(self, payload):
+        self.snipe(payload.cached_message)
 
+    @timed_listener("snipe.on_raw_bulk_message_delete")
+    async def on_raw_bulk_message_delete(self, payload):
+        for message in sorted(payload.cached_messages, key=lambda m: m.id):
+            self.snipe(message)
 
+    async def close(self):
+        # Cogs flush their pending writes while being unloaded in super().close()
+        await super().close()
+        await metrics.stop()
+        await self.storage.close()
 
-print(f"🔒 Token: {TOKEN[:5]}********")
-bot.run(TOKEN)
+# Importable without starting the bot (the bench/ harness builds its own JengBot)
+if __name__ == "__main__":
+    setup_logging()
+    bot = JengBot()
+    log.info("Token: %s********", TOKEN[:5])
+    # Our own logging setup already covers discord.py's loggers
+    bot.run(TOKEN, log_handler=None)
@@ -0,0 +1,70 @@
+# utils/cogs.py
+#
+# Which cogs to load and loading them. Every file in cogs/ is a candidate; COGS limits
+# the set to a comma-separated allowlist and DISABLED_COGS removes entries from it, so
+# an XP-only deployment can run with COGS=xp and never import the music stack.
+# Extensions load concurrently and each one's load time is logged at startup.
+
+import asyncio
+import os
+import resource
+import time
+
+from utils.log import fields, get_logger
+
+COGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cogs")
+
+log = get_logger("cogs")
+
+
+def parse_names(value):
+    return {name.strip().lower() for name in (value or "").split(",") if name.strip()}
+
+
+def available_cogs(directory=COGS_DIR):
+    return sorted(f[:-3] for f in os.listdir(directory) if f.endswith(".py") and not f.startswith("_"))
+
+
+def selected_cogs(enabled=None, disabled=None, directory=COGS_DIR):
+    """The cogs to load: the COGS allowlist (everything if unset) minus DISABLED_COGS."""
+    available = available_cogs(directory)
+    enabled = parse_names(os.getenv("COGS") if enabled is None else enabled)
+    disabled = parse_names(os.getenv("DISABLED_COGS") if disabled is None else disabled)
+
+    unknown = (enabled | disabled) - set(available)
+    if unknown:
+        log.warning("Unknown cogs in COGS/DISABLED_COGS: %s", ", ".join(sorted(unknown)))
+
+    return [name for name in available if (not enabled or name in enabled) and name not in disabled]
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def load_cogs(bot, names):
+    """Load the given cogs concurrently and return {name: seconds}.
+
+    Module imports still run one at a time on the event loop; what overlaps is each
+    cog's async setup (cog_load queries, view registration, ...).
+    """
+    timings = {}
+
+    async def load(name):
+        start = time.perf_counter()
+        await bot.load_extension(f"cogs.{name}")
+        timings[name] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(load(name) for name in names))
+    total = time.perf_counter() - start
+
+    log.info(
+        "Loaded %d cogs in %.0fms", len(timings), total * 1000,
+        extra=fields(
+            cogs_ms={name: round(seconds * 1000, 1) for name, seconds in sorted(timings.items(), key=lambda item: -item[1])},
+            peak_rss_mib=round(peak_rss_mib(), 1)
+        )
+    )
+    return timings
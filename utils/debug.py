@@ -1,8 +1,15 @@
 # utils/debug.py
 
+import logging
+
+from utils.log import fields, get_logger
+
+log = get_logger("commands")
+
+
 def debug_command(command_name, user, **kwargs):
-    print(f"\033[1;32m[COMMAND] /{command_name}\033[0m triggered by \033[1;33m{user.display_name}\033[0m")
-    if kwargs:
-        print("\033[1;36mInput:\033[0m")
-        for key, value in kwargs.items():
-            print(f"\033[1;31m  {key.capitalize()}: {value}\033[0m")
+    if log.isEnabledFor(logging.INFO):
+        log.info(
+            "/%s triggered by %s", command_name, user.display_name,
+            extra=fields(command=command_name, user_id=user.id, input=kwargs)
+        )
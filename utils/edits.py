@@ -0,0 +1,81 @@
+# utils/edits.py
+#
+# Coalesces message edits. Callers say "this message changed" as often as they like;
+# the first change is edited straight away, and anything that arrives during the next
+# `interval` seconds is folded into a single follow-up edit rendered from the latest
+# state. Busy messages get at most one edit per interval, well under Discord's limits.
+
+import asyncio
+import os
+
+import discord
+
+from utils.log import fields, get_logger
+
+log = get_logger("edits")
+
+EDIT_INTERVAL = float(os.getenv("EDIT_INTERVAL", "2"))
+
+FIELD_LIMIT = 1024  # Discord's maximum embed field value length
+
+
+def truncate(value, limit=FIELD_LIMIT):
+    if len(value) <= limit:
+        return value
+    return value[:limit - 1] + "…"
+
+
+def join_limited(lines, empty="None", limit=FIELD_LIMIT, sep="\n"):
+    """Join lines into one field value, ending with "…and N more" if they don't all fit."""
+    lines = list(lines)
+    if not lines:
+        return empty
+    out = []
+    used = 0
+    for index, line in enumerate(lines):
+        remaining = len(lines) - index - 1
+        suffix = len(f"{sep}…and {remaining} more") if remaining else 0
+        cost = len(line) + (len(sep) if out else 0)
+        if used + cost + suffix > limit:
+            return truncate(sep.join(out + [f"…and {len(lines) - index} more"]), limit)
+        out.append(line)
+        used += cost
+    return sep.join(out)
+
+
+class EditCoalescer:
+    def __init__(self, name="edits", interval=EDIT_INTERVAL):
+        self.name = name
+        self.interval = interval
+        self.pending = {}  # message_id -> (message, render)
+        self.tasks = {}    # message_id -> task that owns edits for that message
+
+    def request(self, message, render):
+        """Schedule an edit of `message` with the kwargs returned by `render()` at edit time."""
+        self.pending[message.id] = (message, render)
+        if message.id not in self.tasks:
+            self.tasks[message.id] = asyncio.create_task(self._run(message.id))
+
+    def cancel(self, message_id):
+        self.pending.pop(message_id, None)
+        task = self.tasks.pop(message_id, None)
+        if task:
+            task.cancel()
+
+    def close(self):
+        for message_id in list(self.tasks):
+            self.cancel(message_id)
+
+    async def _run(self, message_id):
+        try:
+            while message_id in self.pending:
+                message, render = self.pending.pop(message_id)
+                try:
+                    await message.edit(**render())
+                except discord.HTTPException as e:
+                    log.warning("Edit failed: %s", e, extra=fields(owner=self.name, message_id=message_id))
+                # Cool down; requests arriving meanwhile collapse into the next edit
+                await asyncio.sleep(self.interval)
+        finally:
+            if self.tasks.get(message_id) is asyncio.current_task():
+                del self.tasks[message_id]
@@ -0,0 +1,160 @@
+# utils/log.py
+#
+# Logging for the whole bot. Cogs call get_logger("<cog>") and log as usual; records
+# are put on an in-memory queue by a QueueHandler and formatted/written by a
+# QueueListener thread, so the event loop never blocks on stdout or a log file.
+#
+# Settings (env):
+#   LOG_LEVEL   DEBUG/INFO/WARNING/... (default INFO)
+#   LOG_FORMAT  "json" (one object per line, default) or "text"
+#   LOG_FILE    also append to this file
+#   LOG_SAMPLE  per-logger keep rates for DEBUG/INFO records, e.g. "xp.awards=0.01,music=0.5".
+#               Warnings and errors are never sampled out.
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT = "jeng"
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_FILE = os.getenv("LOG_FILE")
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+
+_listener = None
+
+
+def parse_rates(spec):
+    rates = {}
+    for part in spec.split(","):
+        name, _, rate = part.partition("=")
+        if name.strip() and rate.strip():
+            rates[f"{ROOT}.{name.strip()}"] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return line
+
+
+class SampleFilter(logging.Filter):
+    # Keeps a fraction of low-level records from chatty loggers. The rate for a logger is
+    # the one configured for its closest ancestor, e.g. "jeng.xp" covers "jeng.xp.awards".
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self.resolved = {}
+
+    def rate_for(self, name):
+        rate = self.resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            probe = name
+            while probe:
+                if probe in self.rates:
+                    rate = self.rates[probe]
+                    break
+                probe = probe.rpartition(".")[0]
+            self.resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+# Shared by every logger; get_logger() adds code defaults that LOG_SAMPLE hasn't set
+_sampler = SampleFilter(parse_rates(LOG_SAMPLE))
+
+
+class DeferredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The default prepare() formats the record on the calling thread. Only resolve
+        # the message here and leave the formatting to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging():
+    """Route the bot's and discord.py's logging through one background writer. Idempotent."""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else TextFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        handlers.append(logging.FileHandler(LOG_FILE, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    queue_handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(logging.WARNING)
+    logging.getLogger(ROOT).setLevel(LOG_LEVEL)
+    logging.getLogger("discord").setLevel(logging.INFO)
+
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # drains whatever is still queued
+        _listener = None
+
+
+def get_logger(name, sample=None):
+    """Logger for one part of the bot. `sample` sets a default keep rate for its DEBUG/INFO records."""
+    full_name = f"{ROOT}.{name}"
+    if sample is not None and full_name not in _sampler.rates:
+        _sampler.rates[full_name] = sample
+        _sampler.resolved.clear()
+    return logging.getLogger(full_name)
+
+
+def fields(**values):
+    """Structured fields for a log call: log.info("...", extra=fields(user_id=1))."""
+    return {"fields": values}
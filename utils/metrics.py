@@ -0,0 +1,253 @@
+# utils/metrics.py
+#
+# In-process instrumentation: latency histograms for slash commands and event
+# listeners, an event-loop lag probe, and a count of slow callbacks. Everything is
+# kept in one registry (`metrics`) that renders Prometheus text for a small HTTP
+# endpoint bound to localhost, and p50/p95/p99 for the /latency admin command.
+#
+# Settings (env):
+#   METRICS_HOST / METRICS_PORT  where /metrics is served (port 0 disables it)
+#   LOOP_LAG_INTERVAL            seconds between loop-lag probes
+#   SLOW_CALLBACK                lag (seconds) that counts as a slow callback
+#   METRICS_LOOP_DEBUG           "1" turns on asyncio debug mode so each slow callback is
+#                                counted individually (costs some overhead)
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import deque
+
+from aiohttp import web
+from discord import app_commands
+
+from utils.log import get_logger
+
+log = get_logger("metrics")
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+SLOW_CALLBACK = float(os.getenv("SLOW_CALLBACK", "0.1"))
+METRICS_LOOP_DEBUG = os.getenv("METRICS_LOOP_DEBUG", "0") == "1"
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SAMPLES = 1024  # per series, for percentiles
+
+
+class Histogram:
+    __slots__ = ("buckets", "sum", "count", "recent")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        self.buckets[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentiles(self, *qs):
+        """Percentiles over the most recent samples (qs in 0-100)."""
+        values = sorted(self.recent)
+        if not values:
+            return [0.0 for _ in qs]
+        return [values[min(len(values) - 1, int(len(values) * q / 100))] for q in qs]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.counters = {}    # (name, labels) -> number
+        self.gauges = {}      # prefix -> callable returning {name: number}
+        self.help = {}        # name -> description
+        self.lag_task = None
+        self.runner = None
+
+    # --- Recording ---
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def register_gauges(self, prefix, fn):
+        """Export every numeric value of fn() as a gauge named <prefix>_<key>."""
+        self.gauges[prefix] = fn
+
+    def unregister_gauges(self, prefix):
+        self.gauges.pop(prefix, None)
+
+    def series(self, name):
+        """[(labels dict, Histogram)] for one histogram name."""
+        return [(dict(labels), histogram) for (n, labels), histogram in self.histograms.items() if n == name]
+
+    # --- Export ---
+    def render_prometheus(self):
+        lines = []
+        for name in sorted({name for name, _ in self.histograms}):
+            full = f"jeng_{name}"
+            if name in self.help:
+                lines.append(f"# HELP {full} {self.help[name]}")
+            lines.append(f"# TYPE {full} histogram")
+            for labels, histogram in self.series(name):
+                base = tuple(sorted(labels.items()))
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float("inf"),), histogram.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{full}_bucket{_labels(base + (('le', le),))} {cumulative}")
+                lines.append(f"{full}_sum{_labels(base)} {histogram.sum}")
+                lines.append(f"{full}_count{_labels(base)} {histogram.count}")
+
+        for name in sorted({name for name, _ in self.counters}):
+            full = f"jeng_{name}_total"
+            if name in self.help:
+                lines.append(f"# HELP {full} {self.help[name]}")
+            lines.append(f"# TYPE {full} counter")
+            for (n, labels), value in self.counters.items():
+                if n == name:
+                    lines.append(f"{full}{_labels(labels)} {value}")
+
+        for prefix, fn in list(self.gauges.items()):
+            try:
+                values = fn()
+            except Exception as e:
+                log.warning("Gauge %s failed: %s", prefix, e)
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    full = f"jeng_{prefix}_{key}"
+                    lines.append(f"# TYPE {full} gauge")
+                    lines.append(f"{full} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    # --- Background probes ---
+    async def start(self):
+        if METRICS_LOOP_DEBUG:
+            loop = asyncio.get_running_loop()
+            loop.set_debug(True)
+            loop.slow_callback_duration = SLOW_CALLBACK
+            logging.getLogger("asyncio").addFilter(SlowCallbackCounter(self))
+        self.lag_task = asyncio.create_task(self.probe_loop_lag())
+        if METRICS_PORT:
+            app = web.Application()
+            app.router.add_get("/metrics", self.handle_metrics)
+            self.runner = web.AppRunner(app, access_log=None)
+            await self.runner.setup()
+            try:
+                await web.TCPSite(self.runner, METRICS_HOST, METRICS_PORT).start()
+            except OSError as e:
+                # Port taken (often a second instance); the bot runs fine without the endpoint
+                log.warning("Could not serve metrics on %s:%d: %s", METRICS_HOST, METRICS_PORT, e)
+                await self.runner.cleanup()
+                self.runner = None
+                return
+            log.info("Serving metrics on http://%s:%d/metrics", METRICS_HOST, METRICS_PORT)
+
+    async def stop(self):
+        if self.lag_task:
+            self.lag_task.cancel()
+            try:
+                await self.lag_task
+            except asyncio.CancelledError:
+                pass
+            self.lag_task = None
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(text=self.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def probe_loop_lag(self):
+        # A sleep that wakes up late means something held the loop for the difference
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, loop.time() - start - LOOP_LAG_INTERVAL)
+            self.observe("loop_lag_seconds", lag)
+            if lag >= SLOW_CALLBACK and not METRICS_LOOP_DEBUG:
+                self.inc("slow_callbacks")
+
+
+class SlowCallbackCounter(logging.Filter):
+    # asyncio debug mode logs "Executing <Handle ...> took 0.3 seconds" for each slow callback
+    def __init__(self, registry):
+        super().__init__()
+        self.registry = registry
+
+    def filter(self, record):
+        if isinstance(record.msg, str) and record.msg.startswith("Executing"):
+            self.registry.inc("slow_callbacks")
+        return True
+
+
+metrics = Metrics()
+metrics.describe("command_seconds", "Slash command latency from dispatch to completion")
+metrics.describe("listener_seconds", "Event listener run time")
+metrics.describe("loop_lag_seconds", "How late a scheduled wake-up ran")
+metrics.describe("slow_callbacks", "Loop stalls longer than SLOW_CALLBACK")
+
+
+def timed_listener(name=None):
+    """Record a listener's run time under listener_seconds{listener=name}. Place below @listener()."""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                metrics.observe("listener_seconds", time.perf_counter() - start, listener=label)
+        return wrapper
+    return decorator
+
+
+def record_command(interaction, status):
+    started = interaction.extras.get("started_at")
+    if started is None or interaction.command is None:
+        return
+    metrics.observe(
+        "command_seconds", time.perf_counter() - started,
+        command=interaction.command.qualified_name, status=status
+    )
+
+
+class InstrumentedTree(app_commands.CommandTree):
+    # Stamps every slash command as it is dispatched; the bot's completion/error hooks
+    # turn the stamp into a latency sample
+    async def interaction_check(self, interaction):
+        interaction.extras["started_at"] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction, error):
+        record_command(interaction, "error")
+        await super().on_error(interaction, error)
@@ -0,0 +1,133 @@
+# utils/migrate.py
+#
+# One-shot import of the old whole-file JSON documents into SQLite.
+# Runs automatically on first startup; can also be run by hand:
+#   python -m utils.migrate [--force]
+
+import asyncio
+import json
+import os
+import sys
+
+from utils.storage import Storage
+
+XP_FILE = "xp_data.json"
+QUOTE_FILE = "quotes.json"
+WELCOME_CONFIG = "welcome_config.json"
+XP_CONFIG_FILE = "xp_config.json"
+
+MIGRATED_KEY = "json_migrated"
+XP_CONFIG_MIGRATED_KEY = "xp_config_json_migrated"
+
+
+def load_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f) or {}
+    except json.JSONDecodeError:
+        return {}
+
+
+def import_documents(conn, xp_data, quotes, welcome):
+    xp_rows = []
+    config_rows = []
+    blocked_rows = []
+
+    for guild_id, users in xp_data.items():
+        for user_id, data in users.items():
+            if user_id == "config":
+                if "xp_per_message" in data:
+                    config_rows.append((int(guild_id), int(data["xp_per_message"])))
+                for channel_id in data.get("blocked_channels", []):
+                    blocked_rows.append((int(guild_id), int(channel_id)))
+                continue
+            if not isinstance(data, dict):
+                continue
+            xp_rows.append((int(guild_id), int(user_id), int(data.get("xp", 0)), int(data.get("level", 0))))
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO xp_users (guild_id, user_id, xp, level) VALUES (?, ?, ?, ?)",
+        xp_rows
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO xp_config (guild_id, xp_per_message) VALUES (?, ?)",
+        config_rows
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO xp_blocked_channels (guild_id, channel_id) VALUES (?, ?)",
+        blocked_rows
+    )
+
+    # Replace rather than append so a forced re-import doesn't duplicate quotes
+    conn.executemany("DELETE FROM quotes WHERE guild_id = ?", [(int(guild_id),) for guild_id in quotes])
+    quote_rows = [(int(guild_id), text) for guild_id, texts in quotes.items() for text in texts]
+    conn.executemany("INSERT INTO quotes (guild_id, text) VALUES (?, ?)", quote_rows)
+
+    welcome_rows = [
+        (
+            int(guild_id),
+            int(config["channel_id"]),
+            config.get("message", ""),
+            int(config["role_id"]) if config.get("role_id") else None
+        )
+        for guild_id, config in welcome.items()
+    ]
+    conn.executemany(
+        "INSERT OR REPLACE INTO welcome_config (guild_id, channel_id, message, role_id) VALUES (?, ?, ?, ?)",
+        welcome_rows
+    )
+
+    return len(xp_rows), len(quote_rows), len(welcome_rows)
+
+
+def import_xp_config(conn, xp_config):
+    # xp_config.json predates the per-guild "config" block in xp_data.json and was never read.
+    # Fold it into the same tables without overriding rates that were set through /xpset.
+    conn.executemany(
+        "INSERT OR IGNORE INTO xp_config (guild_id, xp_per_message) VALUES (?, ?)",
+        [(int(guild_id), int(config["xp_per_message"])) for guild_id, config in xp_config.items() if "xp_per_message" in config]
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO xp_blocked_channels (guild_id, channel_id) VALUES (?, ?)",
+        [(int(guild_id), int(channel_id)) for guild_id, config in xp_config.items() for channel_id in config.get("blocked_channels", [])]
+    )
+
+
+async def migrate_json_files(storage, force=False):
+    """Import the legacy JSON files once. Returns the row counts, or None if already done."""
+    counts = None
+
+    if force or not await storage.get_meta(MIGRATED_KEY):
+        counts = await storage.transaction(
+            import_documents,
+            load_json(XP_FILE),
+            load_json(QUOTE_FILE),
+            load_json(WELCOME_CONFIG)
+        )
+        await storage.set_meta(MIGRATED_KEY, "1")
+
+    if force or not await storage.get_meta(XP_CONFIG_MIGRATED_KEY):
+        await storage.transaction(import_xp_config, load_json(XP_CONFIG_FILE))
+        await storage.set_meta(XP_CONFIG_MIGRATED_KEY, "1")
+
+    return counts
+
+
+async def main():
+    storage = Storage()
+    await storage.open()
+    try:
+        counts = await migrate_json_files(storage, force="--force" in sys.argv)
+    finally:
+        await storage.close()
+
+    if counts is None:
+        print("Already migrated (use --force to import again).")
+    else:
+        print("Imported {} XP rows, {} quotes, {} welcome configs into {}".format(*counts, storage.path))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
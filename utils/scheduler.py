@@ -0,0 +1,102 @@
+# utils/scheduler.py
+#
+# Keyed one-shot timers driven by a single task. Deadlines sit in a heap and the
+# task sleeps until the earliest one, so a thousand pending timers cost one sleeping
+# coroutine instead of a thousand. Cancelling is O(1): the key is dropped from the
+# timer map and its stale heap entry is skipped when it reaches the top.
+
+import asyncio
+import heapq
+import itertools
+import time
+
+from utils.log import fields, get_logger
+
+log = get_logger("scheduler")
+
+
+class DeadlineScheduler:
+    def __init__(self, name="scheduler"):
+        self.name = name
+        self.heap = []      # (deadline, seq, key)
+        self.timers = {}    # key -> (deadline, seq, callback)
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.running = set()
+
+    def __contains__(self, key):
+        return key in self.timers
+
+    def __len__(self):
+        return len(self.timers)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def schedule(self, key, callback, delay=None, at=None):
+        """Run `await callback()` once at wall-clock time `at` (or `delay` seconds from now).
+
+        Scheduling an existing key replaces its timer.
+        """
+        deadline = at if at is not None else time.time() + delay
+        seq = next(self.counter)
+        self.timers[key] = (deadline, seq, callback)
+        heapq.heappush(self.heap, (deadline, seq, key))
+        self._compact()
+        self.wakeup.set()
+
+    def cancel(self, key):
+        return self.timers.pop(key, None) is not None
+
+    def _is_live(self, entry):
+        _, seq, key = entry
+        timer = self.timers.get(key)
+        return timer is not None and timer[1] == seq
+
+    def _compact(self):
+        # Cancelled/replaced entries are normally dropped lazily; rebuild if they pile up
+        if len(self.heap) > 64 and len(self.heap) > 2 * len(self.timers):
+            self.heap = [(deadline, seq, key) for key, (deadline, seq, _) in self.timers.items()]
+            heapq.heapify(self.heap)
+
+    async def _run(self):
+        while True:
+            while self.heap and not self._is_live(self.heap[0]):
+                heapq.heappop(self.heap)
+
+            if not self.heap:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+
+            delay = self.heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                continue
+
+            _, _, key = heapq.heappop(self.heap)
+            _, _, callback = self.timers.pop(key)
+            task = asyncio.create_task(self._fire(key, callback))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _fire(self, key, callback):
+        try:
+            await callback()
+        except Exception as e:
+            log.exception("Timer failed: %s", e, extra=fields(owner=self.name, key=key))
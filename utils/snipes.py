@@ -0,0 +1,80 @@
+# utils/snipes.py
+#
+# Recently deleted messages for /snipe. Each channel keeps a small ring buffer of
+# compact records (no Member objects), entries expire after SNIPE_TTL, and only the
+# SNIPE_MAX_CHANNELS most recently active channels are kept at all.
+
+import os
+import time
+from collections import OrderedDict, deque
+
+SNIPE_PER_CHANNEL = int(os.getenv("SNIPE_PER_CHANNEL", "10"))      # deleted messages kept per channel
+SNIPE_MAX_CHANNELS = int(os.getenv("SNIPE_MAX_CHANNELS", "1000"))  # channels tracked before the oldest is dropped
+SNIPE_TTL = float(os.getenv("SNIPE_TTL", "3600"))                  # seconds a deleted message stays snipeable
+
+
+class SnipedMessage:
+    __slots__ = ("author_id", "author_name", "avatar_url", "content", "created_at", "deleted_at")
+
+    def __init__(self, author_id, author_name, avatar_url, content, created_at, deleted_at):
+        self.author_id = author_id
+        self.author_name = author_name
+        self.avatar_url = avatar_url
+        self.content = content
+        self.created_at = created_at
+        self.deleted_at = deleted_at
+
+    @classmethod
+    def from_message(cls, message):
+        author = message.author
+        return cls(
+            author.id,
+            author.display_name,
+            author.avatar.url if author.avatar else None,
+            message.content,
+            message.created_at,
+            time.monotonic()
+        )
+
+
+class SnipeStore:
+    def __init__(self, per_channel=SNIPE_PER_CHANNEL, max_channels=SNIPE_MAX_CHANNELS, ttl=SNIPE_TTL):
+        self.per_channel = per_channel
+        self.max_channels = max_channels
+        self.ttl = ttl
+        self.channels = OrderedDict()  # channel_id -> deque of SnipedMessage, newest on the right
+
+    def __len__(self):
+        return len(self.channels)
+
+    def add(self, channel_id, record):
+        buffer = self.channels.get(channel_id)
+        if buffer is None:
+            buffer = self.channels[channel_id] = deque(maxlen=self.per_channel)
+        buffer.append(record)
+        self.channels.move_to_end(channel_id)
+        while len(self.channels) > self.max_channels:
+            self.channels.popitem(last=False)
+
+    def _live(self, channel_id):
+        buffer = self.channels.get(channel_id)
+        if buffer is None:
+            return None
+        cutoff = time.monotonic() - self.ttl
+        while buffer and buffer[0].deleted_at < cutoff:
+            buffer.popleft()
+        if not buffer:
+            del self.channels[channel_id]
+            return None
+        return buffer
+
+    def count(self, channel_id):
+        buffer = self._live(channel_id)
+        return len(buffer) if buffer else 0
+
+    def get(self, channel_id, index=1):
+        """The index-th most recently deleted message (1 = latest), or None."""
+        buffer = self._live(channel_id)
+        if not buffer or not 1 <= index <= len(buffer):
+            return None
+        return buffer[-index]
@@ -0,0 +1,211 @@
+# utils/storage.py
+#
+# Shared SQLite storage used by the cogs. One connection lives on a single
+# worker thread, so every query runs off the event loop and never races itself.
+
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_DB_FILE = "jeng.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS xp_users (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    xp INTEGER NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS xp_users_rank ON xp_users (guild_id, level DESC, xp DESC);
+
+CREATE TABLE IF NOT EXISTS xp_config (
+    guild_id INTEGER PRIMARY KEY,
+    xp_per_message INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS xp_blocked_channels (
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, channel_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quotes_guild ON quotes (guild_id, id);
+
+CREATE TABLE IF NOT EXISTS welcome_config (
+    guild_id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    role_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS track_cache (
+    video_id TEXT PRIMARY KEY,
+    title TEXT,
+    thumbnail TEXT,
+    duration INTEGER,
+    webpage_url TEXT,
+    updated_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS track_cache_recent ON track_cache (updated_at);
+
+CREATE TABLE IF NOT EXISTS polls (
+    message_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    creator_id INTEGER NOT NULL,
+    creator_name TEXT NOT NULL,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    anonymous INTEGER NOT NULL,
+    closes_at REAL NOT NULL,
+    closed INTEGER NOT NULL DEFAULT 0,
+    buttons INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS polls_open ON polls (closed, closes_at);
+
+CREATE TABLE IF NOT EXISTS poll_votes (
+    message_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    option INTEGER NOT NULL,
+    voted_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (message_id, user_id, option)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS events (
+    message_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    creator_id INTEGER NOT NULL,
+    creator_name TEXT NOT NULL,
+    title TEXT NOT NULL,
+    time TEXT NOT NULL,
+    location TEXT NOT NULL,
+    details TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS event_rsvps (
+    message_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    going INTEGER NOT NULL,
+    PRIMARY KEY (message_id, user_id)
+) WITHOUT ROWID;
+"""
+
+# Columns added after their table first shipped. CREATE TABLE IF NOT EXISTS leaves an
+# existing table alone, so these are added by hand when missing.
+COLUMN_MIGRATIONS = [
+    ("polls", "buttons", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+def add_missing_columns(conn):
+    for table, column, definition in COLUMN_MIGRATIONS:
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def widen_poll_votes_key(conn):
+    # poll_votes used to hold one row per user. Reaction polls now keep every option a
+    # user reacted with, so the key includes the option; SQLite can't alter a primary
+    # key, so older tables are copied into the new shape.
+    key = [row[1] for row in sorted(conn.execute("PRAGMA table_info(poll_votes)"), key=lambda row: row[5]) if row[5]]
+    if key != ["message_id", "user_id"]:
+        return
+    conn.execute("ALTER TABLE poll_votes RENAME TO poll_votes_old")
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT INTO poll_votes (message_id, user_id, option) SELECT message_id, user_id, option FROM poll_votes_old")
+    conn.execute("DROP TABLE poll_votes_old")
+
+
+class Storage:
+    def __init__(self, path=None):
+        self.path = path or os.getenv("DB_FILE", DEFAULT_DB_FILE)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+        self.conn = None
+
+    # --- Worker-thread helpers (only ever called on the storage thread) ---
+    def _open(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        add_missing_columns(conn)
+        widen_poll_votes_key(conn)
+        conn.commit()
+        self.conn = conn
+
+    def _close(self):
+        self.conn.close()
+        self.conn = None
+
+    def _execute(self, sql, params):
+        with self.conn:
+            return self.conn.execute(sql, params).lastrowid
+
+    def _executemany(self, sql, rows):
+        with self.conn:
+            self.conn.executemany(sql, rows)
+
+    def _fetchall(self, sql, params):
+        return self.conn.execute(sql, params).fetchall()
+
+    def _fetchone(self, sql, params):
+        return self.conn.execute(sql, params).fetchone()
+
+    def _transaction(self, fn, args):
+        with self.conn:
+            return fn(self.conn, *args)
+
+    async def _submit(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    # --- Async API ---
+    async def open(self):
+        await self._submit(self._open)
+
+    async def close(self):
+        if self.conn is not None:
+            await self._submit(self._close)
+        self.executor.shutdown(wait=True)
+
+    async def execute(self, sql, params=()):
+        """Run one statement in its own transaction and return the last row id."""
+        return await self._submit(self._execute, sql, params)
+
+    async def executemany(self, sql, rows):
+        await self._submit(self._executemany, sql, list(rows))
+
+    async def fetchall(self, sql, params=()):
+        return await self._submit(self._fetchall, sql, params)
+
+    async def fetchone(self, sql, params=()):
+        return await self._submit(self._fetchone, sql, params)
+
+    async def transaction(self, fn, *args):
+        """Run fn(conn, *args) on the storage thread inside a single transaction."""
+        return await self._submit(self._transaction, fn, args)
+
+    async def get_meta(self, key, default=None):
+        row = await self.fetchone("SELECT value FROM meta WHERE key = ?", (key,))
+        return row[0] if row else default
+
+    async def set_meta(self, key, value):
+        await self.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value))
+        )
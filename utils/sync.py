@@ -0,0 +1,64 @@
+# utils/sync.py
+#
+# Slash-command sync that only talks to Discord when the command tree actually changed.
+# The tree is serialised the same way sync() would send it, hashed, and the hash is kept
+# in the meta table per application and scope; a restart with the same commands skips
+# the (rate-limited) sync call entirely.
+#
+# DEV_GUILD_ID copies the global commands into one guild and syncs only there, which
+# updates instantly while developing. COMMAND_SYNC=force always syncs, =off never does.
+
+import hashlib
+import json
+import os
+
+import discord
+
+from utils.log import fields, get_logger
+
+log = get_logger("sync")
+
+HASH_KEY = "command_tree_hash"
+
+
+def tree_hash(tree, guild=None):
+    # Sorted so the hash doesn't depend on the order cogs happened to load in
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get("type", 1), command["name"])
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+async def sync_commands(bot, storage, dev_guild_id=None, mode=None):
+    """Sync bot.tree if it changed since the last sync. Returns True if it synced."""
+    mode = (mode or os.getenv("COMMAND_SYNC", "auto")).lower()
+    if dev_guild_id is None and os.getenv("DEV_GUILD_ID"):
+        dev_guild_id = int(os.getenv("DEV_GUILD_ID"))
+    if mode == "off":
+        log.info("Command sync disabled")
+        return False
+
+    guild = None
+    scope = "global"
+    if dev_guild_id:
+        guild = discord.Object(id=dev_guild_id)
+        bot.tree.copy_global_to(guild=guild)
+        scope = f"guild:{dev_guild_id}"
+
+    key = f"{HASH_KEY}:{bot.application_id}:{scope}"
+    digest = tree_hash(bot.tree, guild)
+    if mode != "force" and await storage.get_meta(key) == digest:
+        log.info("Slash commands unchanged, skipping sync", extra=fields(scope=scope))
+        return False
+
+    try:
+        synced = await bot.tree.sync(guild=guild)
+    except discord.HTTPException as e:
+        # Leave the stored hash alone so the next start tries again
+        log.error("Slash command sync failed: %s", e, extra=fields(scope=scope))
+        return False
+
+    await storage.set_meta(key, digest)
+    log.info("Synced %d slash commands", len(synced), extra=fields(scope=scope, hash=digest[:12]))
+    return True
@@ -0,0 +1,90 @@
+# utils/users.py
+#
+# Resolves user IDs to display names for embeds. Cached members/users are used
+# first; anything else is fetched over REST concurrently (with a cap) and kept
+# in a small TTL/LRU cache so repeated leaderboards don't refetch the same people.
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+import discord
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "600"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "2048"))
+USER_FETCH_CONCURRENCY = int(os.getenv("USER_FETCH_CONCURRENCY", "4"))
+
+_MISSING = object()
+
+
+class UserResolver:
+    def __init__(self, bot, ttl=USER_CACHE_TTL, max_size=USER_CACHE_SIZE, concurrency=USER_FETCH_CONCURRENCY):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_size = max_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.cache = OrderedDict()  # user_id -> (display name or None, expires_at)
+
+        self.hits = 0      # answered from the gateway cache or our own cache
+        self.misses = 0    # needed a REST fetch
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self.cache)}
+
+    def _get_cached(self, user_id):
+        entry = self.cache.get(user_id)
+        if entry is None:
+            return _MISSING
+        name, expires_at = entry
+        if expires_at < time.monotonic():
+            del self.cache[user_id]
+            return _MISSING
+        self.cache.move_to_end(user_id)
+        return name
+
+    def _store(self, user_id, name):
+        self.cache[user_id] = (name, time.monotonic() + self.ttl)
+        self.cache.move_to_end(user_id)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+    async def _fetch_name(self, user_id):
+        async with self.semaphore:
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.NotFound:
+                name = None  # deleted account; remember that too
+            except discord.HTTPException:
+                return None  # transient, don't cache
+            else:
+                name = user.display_name
+        self._store(user_id, name)
+        return name
+
+    async def display_names(self, guild, user_ids):
+        """Map each user ID to a display name, or None if the user can't be found."""
+        names = {}
+        to_fetch = []
+
+        for user_id in user_ids:
+            user = (guild.get_member(user_id) if guild else None) or self.bot.get_user(user_id)
+            if user is not None:
+                names[user_id] = user.display_name
+                self.hits += 1
+                continue
+
+            name = self._get_cached(user_id)
+            if name is not _MISSING:
+                names[user_id] = name
+                self.hits += 1
+                continue
+
+            to_fetch.append(user_id)
+
+        if to_fetch:
+            self.misses += len(to_fetch)
+            fetched = await asyncio.gather(*(self._fetch_name(user_id) for user_id in to_fetch))
+            names.update(zip(to_fetch, fetched))
+
+        return names